@@ -0,0 +1,73 @@
+"""
+Benchmark of the GeoIP backends: mmdb reader (GeoIPResolver) vs flat searchsorted index (GeoIPFlatIndex).
+
+Usage:
+    python benchmarks/bench_geoip.py [n_rows] [n_unique]
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.geoip_flat_index import GeoIPFlatIndex
+from src.geoip_resolver import GeoIPResolver
+
+GEOIP_DB_PATH = "db/GeoLite2-City_20251202/GeoLite2-City.mmdb"
+GEOIP_FLAT_INDEX_DIR = "db/GeoLite2-City_flat_index"
+
+
+def random_ips(n_rows: int, n_unique: int, seed: int = 42) -> pd.Series:
+    """
+    Generate a column of IPv4 addresses with repetitions, like attack logs.
+
+    Args:
+        n_rows (int): Number of rows of the column.
+        n_unique (int): Number of distinct addresses drawn from.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        pd.Series: Series of dotted-quad strings.
+    """
+    rng = np.random.default_rng(seed)
+    octets = pd.DataFrame(rng.integers(1, 255, size=(n_unique, 4))).astype(str)
+    pool = octets[0] + "." + octets[1] + "." + octets[2] + "." + octets[3]
+    return pool.iloc[rng.integers(0, n_unique, size=n_rows)].reset_index(drop=True)
+
+
+def time_resolve(name: str, resolver, ips: pd.Series) -> pd.DataFrame:
+    """
+    Resolve the column with a backend and print its throughput.
+
+    Args:
+        name (str): Label of the backend in the report.
+        resolver (GeoIPResolver | GeoIPFlatIndex): Backend to benchmark.
+        ips (pd.Series): Column of IP addresses.
+
+    Returns:
+        pd.DataFrame: The resolved column.
+    """
+    start_t = time.perf_counter()
+    resolved = resolver.resolve(ips)
+    tot_t = time.perf_counter() - start_t
+    print(f"{name:<8} {len(ips):>10} rows in {tot_t:8.3f} s = {len(ips) / tot_t:>12,.0f} rows/sec")
+    return resolved
+
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_unique = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    ips = random_ips(n_rows, n_unique)
+
+    start_t = time.perf_counter()
+    flat_index = GeoIPFlatIndex.load_or_build(GEOIP_DB_PATH, GEOIP_FLAT_INDEX_DIR)
+    print(f"flat index ready in {time.perf_counter() - start_t:.3f} s")
+
+    with GeoIPResolver(GEOIP_DB_PATH) as resolver:
+        from_reader = time_resolve("reader", resolver, ips)
+    from_flat = time_resolve("flat", flat_index, ips)
+
+    print(f"rows differing between backends: {len(from_reader.compare(from_flat))}")
@@ -1,6 +1,15 @@
+import argparse
+
 from src.EDA_uge import EDA
 
-# Initialize eda class
-eda = EDA()
-# Runs the Exploratory Data Analysis
-eda.run_EDA()
+# The guard is needed by the process pool running the independent steps concurrently
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the Exploratory Data Analysis pipeline")
+    parser.add_argument("--force", action="store_true", help="run all the steps, ignoring the checkpoints")
+    parser.add_argument("--from-step", help="run this step (e.g. _step2) and the steps depending on it, ignoring their checkpoints")
+    args = parser.parse_args()
+
+    # Initialize eda class
+    eda = EDA()
+    # Runs the Exploratory Data Analysis
+    eda.run_EDA(force=args.force, from_step=args.from_step)
@@ -13,9 +13,10 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots as subp
 from sklearn.metrics import matthews_corrcoef
 import random
+import time
 import django
-from user_agents import parse
-from user_agents import parse as ua_parse
+from src.ingest import read_attacks
+from src.user_agent_features import extract_ua_features
 from django.conf import settings
 # django settings for geoIP2
 settings.configure(
@@ -25,6 +26,11 @@ settings.configure(
 django.setup()
 from django.contrib.gis.geoip2 import GeoIP2
 geoIP = GeoIP2()
+# "django" resolves IPs one by one through GeoIP2 , "flat" resolves whole columns through the searchsorted flat index
+GEOIP_BACKEND = "django"
+if GEOIP_BACKEND == "flat" :
+    from src.geoip_flat_index import GeoIPFlatIndex
+    geoip_flat_index = GeoIPFlatIndex.load_or_build( "data/geolite2_db/GeoLite2-City.mmdb" , "data/geolite2_db/flat_index" )
 
 # useful links
 maxmind_geoip2_db_url = "https://www.maxmind.com/en/accounts/1263991/geoip/downloads"
@@ -33,7 +39,7 @@ geoip2_django_doc_url = "https://docs.djangoproject.com/en/5.2/ref/contrib/gis/g
 
 # loading dataset
 # df = pd.read_csv( "data/cybersecurity_attacks.csv" )
-df = pd.read_csv( "data/df.csv" , sep = "|" , index_col = 0 )
+df = read_attacks( "data/df.csv" , sep = "|" , index_col = 0 )
 
 # transform categorical variable to binary variables [ 0 , 1 ]
 def catvar_mapping( col_name , values , name = None) : 
@@ -43,6 +49,8 @@ def catvar_mapping( col_name , values , name = None) :
     elif ( len( name ) == 1 ) and ( name != [ "/" ]) :
         col_target = f"{ col_name } { name[ 0 ]}"
         df1 = df1.rename( columns = { col_name : col_target })
+        # the column is overwritten with 0 / 1 , categorical columns go back to object first
+        df1[ col_target ] = df1[ col_target ].astype( object )
         col_name = col_target
         name = [ col_target ]
     col = df1.columns.get_loc( col_name ) + 1
@@ -75,21 +83,33 @@ def piechart_col( col , names = None ) :
             )
         fig.show()
 
-# transforms IP addresses to infos : longitude , latitude , country , city
+# transforms IP addresses to infos : latitude , longitude , country , city ( one lookup per IP )
 def ip_to_coords( ip_address ) :
-    print( ip_address )
-    ret = pd.Series( dtype = object )
-    try :
-        res = geoIP.geos( ip_address ).wkt
-        lon , lat = res.replace( "(" , "" ).replace( ")" , "" ).split()[ 1 : ]
-        ret = pd.concat([ ret , pd.Series([ lat , lon ])] , ignore_index = True )
-    except :
-        ret = pd.concat([ ret , pd.Series([ pd.NA , pd.NA ])] , ignore_index = True )
+    if GEOIP_BACKEND == "flat" :
+        return geoip_flat_index.lookup( ip_address )
     try :
         res = geoIP.city( ip_address )
-        ret = pd.concat([ ret , pd.Series([ res[ "country_name" ] , res[ "city" ]])] , ignore_index = True )
-    except :
-        ret = pd.concat([ ret , pd.Series([ pd.NA , pd.NA ])] , ignore_index = True )
+        return ( res[ "latitude" ] , res[ "longitude" ] , res[ "country_name" ] , res[ "city" ])
+    except Exception :
+        return ( np.nan , np.nan , pd.NA , pd.NA )
+
+# batch enrichment of IP columns : dedupes the IPs of all columns , looks up each unique IP once and joins the results back by IP
+def ips_to_coords( ip_cols ) :
+    t_start = time.perf_counter()
+    ips = pd.unique( pd.concat([ df[ col ] for col in ip_cols ]).dropna())
+    if GEOIP_BACKEND == "flat" :
+        ips_geo = geoip_flat_index.resolve( pd.Series( ips , index = ips ))
+        ips_geo.columns = [ "latitude" , "longitude" , "country" , "city" ]
+    else :
+        ips_geo = pd.DataFrame.from_records(
+            [ ip_to_coords( ip ) for ip in ips ] ,
+            index = ips ,
+            columns = [ "latitude" , "longitude" , "country" , "city" ]
+            ).astype({ "latitude" : "float64" , "longitude" : "float64" })
+    ret = { col : ips_geo.reindex( df[ col ]).set_axis( df.index ) for col in ip_cols }
+    t_tot = time.perf_counter() - t_start
+    nrows = df.shape[ 0 ]
+    print( f"geolocated { nrows } rows x { len( ip_cols )} IP columns ( { len( ips )} unique IPs ) in { t_tot :.2f} s = { nrows / t_tot :.0f} rows/sec" )
     return ret
        
         
@@ -135,7 +155,7 @@ fig.show()
 
 #%% IP address
 
-i = 2
+ips_geo = ips_to_coords([ "Source IP Address" , "Destination IP Address" , "Proxy Information" ])
 for destsource in [ "Source" , "Destination" ] :
     col = df.columns.get_loc( f"{ destsource } IP Address" )
     col_insert = [
@@ -146,7 +166,7 @@ for destsource in [ "Source" , "Destination" ] :
         ]
     for col , colnew_name in zip( range( col + 1 , col + len( col_insert ) + 1 ) , col_insert ) :
         df.insert( col , colnew_name , value = pd.NA )
-    df[[ f"{ destsource } IP latitude" , f"{ destsource } IP longitude" , f"{ destsource } IP country" , f"{ destsource } IP city" ]] = df[ f"{ destsource } IP Address" ].apply( lambda x : ip_to_coords( x ))
+    df[[ f"{ destsource } IP latitude" , f"{ destsource } IP longitude" , f"{ destsource } IP country" , f"{ destsource } IP city" ]] = ips_geo[ f"{ destsource } IP Address" ]
 
 ## IP address map graph
 fig = subp(
@@ -218,7 +238,23 @@ col_insert = [
         ]
 for col , colnew_name in zip( range( col + 1 , col + len( col_insert ) + 1 ) , col_insert ) :
     df.insert( col , colnew_name , value = pd.NA )
-df[[ "Proxy latitude" , "Proxy longitude" , "Proxy country" , "Proxy city" ]] = df[ "Proxy Information" ].apply( lambda x : ip_to_coords( x ))
+df[[ "Proxy latitude" , "Proxy longitude" , "Proxy country" , "Proxy city" ]] = ips_geo[ "Proxy Information" ]
+
+# builds the sankey links between adjacent levels : each ( level , next level ) pair of labels is aggregated with a groupby
+# and the "level value" labels are mapped to their node id through a dict
+def sankey_links( counts , lvls , labels ) :
+    label_id = {}
+    for i , lab in enumerate( labels ) :
+        label_id.setdefault( lab , i )
+    links = []
+    for lvl_src , lvl_tgt in zip( lvls[ : - 1 ] , lvls[ 1 : ]) :
+        pair = counts.groupby([ lvl_src , lvl_tgt ] , observed = True )[ "count" ].sum().reset_index()
+        links.append( pd.DataFrame({
+            "source" : ( f"{ lvl_src } " + pair[ lvl_src ].astype( str )).map( label_id ) ,
+            "target" : ( f"{ lvl_tgt } " + pair[ lvl_tgt ].astype( str )).map( label_id ) ,
+            "value" : pair[ "count" ] ,
+            }))
+    return pd.concat( links , ignore_index = True )
 
 def sankey_diag_IPs( ntop ) :
     IPs_col = {}
@@ -244,21 +280,8 @@ def sankey_diag_IPs( ntop ) :
         ]).size().to_frame( "count" )
 
     # computation of source , target , value
-    source = []
-    target = []
-    value = []
-    nlvl = aggregIPs.index.nlevels
-    for idx , row in aggregIPs.iterrows()  :
-        row_labs = []
-        if ( nlvl == 1 ) :
-            row_labs.append( f"{ aggregIPs.index.name } { idx }" )
-        else :
-            for i , val in enumerate( idx ) :
-                row_labs.append( f"{ aggregIPs.index.names[ i ] } { val }" )
-        for i in range( 0 , nlvl - 1 ) :
-            source.append( labels.index( row_labs[ i ]))
-            target.append( labels.index( row_labs[ i + 1 ]))
-            value.append( row.item() )
+    links = sankey_links( aggregIPs.reset_index() , list( aggregIPs.index.names ) , labels )
+    source , target , value = links[ "source" ] , links[ "target" ] , links[ "value" ]
     
     # plot the sankey diagram
     n = len( labels )
@@ -405,6 +428,8 @@ print( df[ col_name ].value_counts())
     Medium = 0
     High = + 1
 """
+# categorical column , back to object to hold the numeric levels
+df[ col_name ] = df[ col_name ].astype( object )
 df.loc[ df[ col_name ] == "Low" , col_name ] = - 1
 df.loc[ df[ col_name ] == "Medium" , col_name ] = 0
 df.loc[ df[ col_name ] == "High" , col_name ] = + 1
@@ -429,31 +454,8 @@ col_insert = [
         ]
 for col , colnew_name in zip( range( col + 1 , col + len( col_insert ) + 1 ) , col_insert ) :
     df.insert( col , colnew_name , value = pd.NA )
-df[ "Browser family" ] = df[ col_name ].apply( lambda x : parse( x ).browser.family if parse( x ).browser.family is not None else pd.NA )
-df[ "Browser major" ] = df[ col_name ].apply( lambda x : parse( x ).browser.version[ 0 ] if parse( x ).browser.version[ 0 ] is not None else pd.NA )
-df[ "Browser minor" ] = df[ col_name ].apply( lambda x: parse( x ).browser.version[ 1 ] if parse( x ).browser.version[ 1 ] is not None else pd.NA )
-df[ "OS family" ] = df[ col_name ].apply( lambda x : parse( x ).os.family if parse( x ).os.family is not None else pd.NA )
-df[ "OS major" ] = df[ col_name ].apply( lambda x : parse( x ).os.version[ 0 ] if len( parse( x ).os.version ) > 0 and parse( x ).os.version[ 0 ] is not None else pd.NA )
-df[ "OS minor" ] = df[ col_name ].apply( lambda x : parse( x ).os.version[ 1 ] if len( parse( x ).os.version ) > 1 and parse( x ).os.version[ 1 ] is not None else pd.NA )
-df[ "OS patch" ] = df[ col_name ].apply( lambda x : parse( x ).os.version[ 2 ] if len( parse( x ).os.version ) > 2 and parse( x ).os.version[ 2 ] is not None else pd.NA )
-df[ "Device family" ] = df[ col_name ].apply (lambda x : parse( x ).device.family if parse( x ).device.family is not None else pd.NA )
-df[ "Device brand" ] = df[ col_name].apply( lambda x : parse( x ).device.brand if parse( x ).device.brand is not None else pd.NA )
-def Device_type( ua_string ) :
-    try :
-        if not ua_string or pd.isna( ua_string ) :
-            return pd.NA
-        ua = ua_parse( ua_string )
-        if getattr( ua , "is_mobile" , False ) :
-            return "Mobile"
-        if getattr( ua , "is_tablet" , False ) :
-            return "Tablet"
-        if getattr( ua , "is_pc", False ) :
-            return "PC"
-        return pd.NA # replaced "Unknown" with pd.NA
-    except :
-        return pd.NA # replaced "Unknown" with pd.NA
-df[ "Device type" ] = df[ col_name ].apply( lambda x : Device_type( x ))
-df[ "Device bot" ] = df[ col_name ].apply( lambda x: ua_parse( x ).is_bot )
+# each distinct User-Agent is parsed once and all the derived columns are filled in one pass
+df[ col_insert ] = extract_ua_features( df[ col_name ])
 
 
 col_name = "Browser family"
@@ -738,27 +740,11 @@ def sankey_diag( cols_bully = [
         vals = df[ c ].unique()
         for v in vals :
             labels.append( f"{ c } { v }" )
-    # computation of source , target , value
-    source = []
-    target = []
-    value = []
-    nlvl = crosstabs.index.nlevels
-    for idx , row in crosstabs.iterrows()  :
-        row_labs = []
-        if ( nlvl == 1 ) :
-            row_labs.append( f"{ crosstabs.index.name } { idx }" )
-        else :
-            for i , val in enumerate( idx ) :
-                row_labs.append( f"{ crosstabs.index.names[ i ] } { val }" )
-        for attype in crosstabs.columns :
-            val = row[ attype ]
-            for i in range( 0 , nlvl - 1 ) :
-                source.append( labels.index( row_labs[ i ]))
-                target.append( labels.index( row_labs[ i + 1 ]))
-                value.append( val )
-            source.append( labels.index( row_labs[ - 1 ]))
-            target.append( labels.index( f"Attack Type { attype }" ))
-            value.append( val )
+    # computation of source , target , value : crosstab in long format with one count per ( levels , Attack Type )
+    lvls = list( crosstabs.index.names )
+    counts = crosstabs.reset_index().melt( id_vars = lvls , var_name = "Attack Type" , value_name = "count" )
+    links = sankey_links( counts , lvls + [ "Attack Type" ] , labels )
+    source , target , value = links[ "source" ] , links[ "target" ] , links[ "value" ]
     
     # plot the sankey diagram
     n = len( labels )
@@ -1,15 +1,22 @@
 import pandas as pd
-import geoip2.database
 import plotly.io
 import plotly.express as px
 import plotly.graph_objects as go
 import pyarrow as pq
-import os
 import numpy as np
 
+from src.geoip_flat_index import GeoIPFlatIndex
+from src.geoip_resolver import GeoIPResolver
+from src.ingest import read_attacks
+
 plotly.io.renderers.default = "browser"
 
 GEOIP_DB_PATH = "db/GeoLite2-City_20251202/GeoLite2-City.mmdb"
+# Incremental IP -> geo cache, rows are invalidated when the GeoLite2 build changes
+GEOIP_CACHE_PATH = "data/geoip_cache.parquet"
+# "reader" resolves through the mmdb reader, "flat" through the searchsorted flat index
+GEOIP_BACKEND = "reader"
+GEOIP_FLAT_INDEX_DIR = "db/GeoLite2-City_flat_index"
 
 ###
 # maxmind_geoip2_db_url = "https://www.maxmind.com/en/accounts/1263991/geoip/downloads"
@@ -18,7 +25,13 @@ GEOIP_DB_PATH = "db/GeoLite2-City_20251202/GeoLite2-City.mmdb"
 ###
 
 
-df = pd.read_csv("data/cybersecurity_attacks.csv" )
+df = read_attacks( "data/cybersecurity_attacks.csv" )
+
+
+if GEOIP_BACKEND == "flat" :
+    resolver = GeoIPFlatIndex.load_or_build( GEOIP_DB_PATH , GEOIP_FLAT_INDEX_DIR )
+else :
+    resolver = GeoIPResolver( GEOIP_DB_PATH , cache_path = GEOIP_CACHE_PATH )
 
 
 def ip_to_coords(ip_address : str ) -> pd.Series :
@@ -31,35 +44,15 @@ def ip_to_coords(ip_address : str ) -> pd.Series :
     Returns:
         pd.Series: series containing [latitude, longitude, country, city]
     """
-    try :
-        with geoip2.database.Reader( GEOIP_DB_PATH ) as reader :
-            response = reader.city( ip_address )
-            lat = response.location.latitude
-            lon = response.location.longitude
-            country = response.country.name
-            city = response.city.name
-            return pd.Series([ lat , lon , country , city ])
-    except Exception as e:
-        print(e)
-        return pd.Series([ pd.NA , pd.NA , pd.NA , pd.NA ])
+    return pd.Series( resolver.lookup( ip_address ))
 
 def ip_to_city( ip_address ) :
-    try :
-        with geoip2.database.Reader( GEOIP_DB_PATH ) as reader :
-            response = reader.city( ip_address )
-            city = response.city.name
-        return city
-    except :
-        return pd.NA
+    city = resolver.lookup( ip_address )[ 3 ]
+    return pd.NA if city is None else city
 
 def ip_to_country( ip_address ) :
-    try :
-        with geoip2.database.Reader( GEOIP_DB_PATH ) as reader :
-            response = reader.city( ip_address )
-            country = response.country.name
-        return country
-    except :
-        return pd.NA
+    country = resolver.lookup( ip_address )[ 2 ]
+    return pd.NA if country is None else country
 
 def piechart_col( col , names = None ) :
     if names is None :
@@ -118,35 +111,32 @@ print( f"dates go from { date_start } and { date_end }" )
 fig = px.histogram( df , col_name )
 fig.show()
 
-if not os.path.exists("data/df_location_data.parquet"):
-    
-    column_names = ["Source IP lat","Source IP long", "Source IP country", "Source IP city",
-                    "Destination IP lat","Destination IP long", "Destination IP country", "Destination IP city"]
-
-    df_ips_data = pd.DataFrame(df["Source IP Address"])
-    df_ips_data = df_ips_data.join(df["Destination IP Address"])
-    df_ips_data = df_ips_data.join(df["Attack Type"])
-    for i in range(len(column_names)):
-        df_ips_data.insert( i , column_names[i] , value = np.nan )
-        print(f"Inserting column {column_names[i]}")
-    print(df_ips_data.head())
-    df_ips_data[[ "Source IP lat","Source IP long", "Source IP country", "Source IP city"]] = df[ "Source IP Address" ].apply( lambda x : ip_to_coords( x ))
-    df_ips_data[[ "Destination IP lat","Destination IP long", "Destination IP country", "Destination IP city" ]] = df[ "Destination IP Address" ].apply( lambda x : ip_to_coords( x ))
-    print(df_ips_data.head())
-
-
-    # df.insert( 2 , "IP latitude" , value = pd.NA )
-    # df.insert( 3 , "IP longitude" , value = pd.NA )
-    # df.insert( 4 , "IP country" , value = pd.NA )
-    # df.insert( 5 , "IP city" , value = pd.NA )
-
-    # df[ "IP country" ] = df[ "Source IP Address" ].apply( lambda x: ip_to_country( x ))
-    # df[ "IP city" ] = df[ "Source IP Address" ].apply( lambda x : ip_to_city( x ))
-    # df[[ "IP latitude" , "IP longitude" , "IP country" , "IP city" ]] = df[ "Source IP Address" ].apply( lambda x : ip_to_coords( x ))
-
-    df_ips_data.to_parquet("data/df_location_data.parquet")
-else:
-    df_ips_data = pd.read_parquet("data/df_location_data.parquet")
+
+column_names = ["Source IP lat","Source IP long", "Source IP country", "Source IP city",
+                "Destination IP lat","Destination IP long", "Destination IP country", "Destination IP city"]
+
+df_ips_data = pd.DataFrame(df["Source IP Address"])
+df_ips_data = df_ips_data.join(df["Destination IP Address"])
+df_ips_data = df_ips_data.join(df["Attack Type"])
+for i in range(len(column_names)):
+    df_ips_data.insert( i , column_names[i] , value = np.nan )
+    print(f"Inserting column {column_names[i]}")
+print(df_ips_data.head())
+df_ips_data[[ "Source IP lat","Source IP long", "Source IP country", "Source IP city"]] = resolver.resolve( df[ "Source IP Address" ])
+df_ips_data[[ "Destination IP lat","Destination IP long", "Destination IP country", "Destination IP city" ]] = resolver.resolve( df[ "Destination IP Address" ])
+print(df_ips_data.head())
+
+
+# df.insert( 2 , "IP latitude" , value = pd.NA )
+# df.insert( 3 , "IP longitude" , value = pd.NA )
+# df.insert( 4 , "IP country" , value = pd.NA )
+# df.insert( 5 , "IP city" , value = pd.NA )
+
+# df[ "IP country" ] = df[ "Source IP Address" ].apply( lambda x: ip_to_country( x ))
+# df[ "IP city" ] = df[ "Source IP Address" ].apply( lambda x : ip_to_city( x ))
+# df[[ "IP latitude" , "IP longitude" , "IP country" , "IP city" ]] = df[ "Source IP Address" ].apply( lambda x : ip_to_coords( x ))
+
+df_ips_data.to_parquet("data/df_location_data.parquet")
 
 fig_source = go.Figure()
 
@@ -278,6 +268,8 @@ print( df[ col_name ].value_counts())
 # High = + 1
 ###
 
+# categorical column, back to object to hold the numeric levels
+df[ col_name ] = df[ col_name ].astype( object )
 df.loc[ df[ col_name ] == "Low" , col_name ] = - 1
 df.loc[ df[ col_name ] == "Medium" , col_name ] = 0
 df.loc[ df[ col_name ] == "High" , col_name ] = + 1
@@ -1,12 +1,20 @@
 import sys
 import time
+from functools import cached_property
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
 
+from src.datetime_features import TIMESTAMP_FORMAT, split_datetime
 from src.download_files import GetFiles
-from src.payload_analyzer import PayloadAnalyzer
+from src.gazetteer import Gazetteer
+from src.geonames import load_alternate_names
+from src.ingest import read_attacks
+from src.payload_analyzer import LOREM_MIN_MARKERS, PayloadAnalyzer
+from src.signature_scanner import SignatureScanner
+from src.steps import Step, StepExecutor
+from src.translation import IdentityBackend, Translator
 import json
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -18,21 +26,18 @@ class EDA():
 
     def __init__(self):
         """
-        Initializes the EDA class loading the necessary 
-        variables in memory and setting up the necessary
-        directories and downloading the necessary files
+        Initializes the EDA class setting up the necessary
+        variables and directories. Files are downloaded and
+        loaded lazily, when a step first needs them
         
         Returns nothing
         """
         self.steps_to_skip = dict()
-        self.run_full_analysis : bool
-        self.runstep : bool
-        self.step_short: str
+        self.step_long: str
         # Defines the directory where to store the datasets
         self.data_dir = str(Path("data")) + "/"
         # Define the components of the filename of the dataset for each step of the EDA
         self.dsbasename = "cyberds"
-        self.step = str()
         self.ext = ".parquet"
         # Defines the file to be downloaded ad tested for presence 
         # at the beginning of the initialization of EDA class.
@@ -43,45 +48,86 @@ class EDA():
         ]
         
         # Add file names and file urls to the dict below to download and check for after download 
-        files_to_download = {
+        self.files_to_download = {
             'alternateNamesV2.zip': 'https://download.geonames.org/export/dump/alternateNamesV2.zip',
             'IN.zip': 'https://download.geonames.org/export/dump/IN.zip',
             'admin1CodesASCII.txt': 'https://download.geonames.org/export/dump/admin1CodesASCII.txt',
             'cybersecurity_attacks.csv' : "https://learn.dsti.institute/pluginfile.php/45207/mod_assign/introattachment/0/Project%201.zip?forcedownload=1"
         }
+        # Download providing each required file
+        self.file_sources = {
+            'alternateNamesV2.txt': 'alternateNamesV2.zip',
+            'IN.txt': 'IN.zip',
+            'admin1CodesASCII.txt': 'admin1CodesASCII.txt',
+            'cybersecurity_attacks.csv': 'cybersecurity_attacks.csv'
+        }
+        # Members to extract from the downloaded zip archives, the others are skipped
+        self.zip_members = {
+            'alternateNamesV2.zip': ['alternateNamesV2.txt'],
+            'IN.zip': ['IN.txt']
+        }
             
         # Mumbai/Delhi are ~20-30 million - anything above is likely a region/country entry
         # Find the most populated actual city (usually Mumbai or Delhi ~20-30M)
         self.max_city_population = 30_000_000  # 30 million as safe threshold
-        
-        # Download the necessary files
-        self.download_files(required_files=self.required_files)
-        
-        # Load main India cities
-        self.india_df = pd.read_csv( str(self.data_dir) + 'IN.txt', sep='\t', header=None,
-            usecols=[0, 1, 4, 5, 10, 14],
-            names=['geonameid', 'name', 'lat', 'lon', 'admin1_code', 'population']
-        )
-        
-        self.admin_df = pd.read_csv(str(self.data_dir) + 'admin1CodesASCII.txt', sep='\t', header=None,
-            names=['code', 'state', 'state_ascii', 'geonameid'])
-        
-        # Convert to string and handle NaN
-        self.india_df['admin1_code'] = self.india_df['admin1_code'].fillna('').astype(str).str.replace('.0', '', regex=False)
-        
-        
-        # Original dataset import to df
-        self.cybersecurity_df = pd.read_csv(str(self.data_dir) + "cybersecurity_attacks.csv" )
-        
-        self.step_short = self.get_first_step()
+        # Minimum trigram (Dice) similarity of a fuzzy city name match, None disables fuzzy matching
+        self.fuzzy_threshold = 0.7
+        # Format of the Timestamp strings, and whether to derive Hour and Weekday besides Day and Time
+        self.timestamp_format = TIMESTAMP_FORMAT
+        self.datetime_features = False
+        # Offline translation of the payloads: IdentityBackend, DictionaryBackend or HTTPBackend (self-hosted server)
+        self.translation_backend = IdentityBackend()
+        # Maximum number of translation batches in flight
+        self.translation_workers = 4
+        # YARA rules (rules/*.yar) and IOC extraction run over the payloads, only IOCs without rules
+        self.signature_scanner = SignatureScanner("rules")
+        # Print the full frames and Series of the analysis instead of summary statistics, slow on big inputs
+        self.verbose = False
+        
+        # The reference tables and the dataset are loaded (and downloaded) on first access,
+        # see the india_df, admin_df and cybersecurity_df properties
+
+        # Steps of the analysis with the columns they read and write, run_EDA orders them by these columns
+        self.steps = [
+            Step("_step1", "Step #1 cleaning of the geolocation column", "clean_geolocation_column",
+                 methods=("load_gazetteer", "build_gazetteer", "gazetteer_version", "india_df", "admin_df"),
+                 inputs=("Geo-location Data",), outputs=("Geolocation Lat", "Geolocation Long"),
+                 params=("fuzzy_threshold", "max_city_population"),
+                 modules=("src.gazetteer", "src.trigram_index", "src.geonames")),
+            Step("_step2", "Step #2 split Timestamp column", "split_datetime_column",
+                 inputs=("Timestamp",),
+                 outputs=("Timestamp", "Day", "Time") + (("Hour", "Weekday") if self.datetime_features else ()),
+                 params=("timestamp_format", "datetime_features"), modules=("src.datetime_features",)),
+            Step("_step3", "Step #3 count bytes in payload data and subtract it from packet length to test if gives the header length of the corresponding ",
+                 "analyse_payload_column", inputs=("Payload Data", "Packet Length", "Packet Type", "Protocol"),
+                 artifacts=("ds_payload_analysis.parquet",), params=("translation_backend", "signature_scanner"),
+                 modules=("src.payload_analyzer", "src.translation", "src.signature_scanner")),
+        ]
+        # Number of steps run concurrently, None for the number of CPUs
+        self.max_workers = None
+
+        self.load_settings()
+
+    def __getstate__(self) -> dict:
+        """
+        Pickle the instance without its data frames, for the step worker processes.
+
+        Workers receive the columns they need separately, the reference tables
+        are lazily reloaded if a step uses them.
+        """
+        state = self.__dict__.copy()
+        for name in ('cybersecurity_df', 'india_df', 'admin_df'):
+            state.pop(name, None)
+        return state
         
     def download_files(self, required_files):
         """
         Check for required files and download them if they are missing.
 
         This method verifies that all required files exist in the data directory.
-        If any files are missing, it initiates the download process using the
-        GetFiles class.
+        If any files are missing, it downloads only the files providing them
+        using the GetFiles class, which skips the files that did not change on
+        the server.
 
         Args:
             required_files (list): List of file paths to check for existence.
@@ -93,11 +139,49 @@ class EDA():
             - Downloads missing files to self.data_dir
             - Prints status message if all files are already present
         """
-        if not all(Path(f).exists() for f in required_files):
-            GetFiles(required_files, Path(self.data_dir))
+        missing = [f for f in required_files if not Path(f).exists()]
+        if missing:
+            downloads = {self.file_sources[Path(f).name] for f in missing}
+            GetFiles({name: self.files_to_download[name] for name in downloads}, Path(self.data_dir),
+                     members=self.zip_members)
         else:
             print("All files already present, skipping download.")
-        
+
+    @cached_property
+    def india_df(self) -> pd.DataFrame:
+        """
+        GeoNames places of India (IN.txt), downloaded and read on first access.
+        """
+        self.download_files([self.data_dir + 'IN.txt'])
+        india_df = pd.read_csv( str(self.data_dir) + 'IN.txt', sep='\t', header=None,
+            usecols=[0, 1, 4, 5, 10, 14],
+            names=['geonameid', 'name', 'lat', 'lon', 'admin1_code', 'population']
+        )
+        # Convert to string and handle NaN
+        india_df['admin1_code'] = india_df['admin1_code'].fillna('').astype(str).str.replace('.0', '', regex=False)
+        return india_df
+
+    @cached_property
+    def admin_df(self) -> pd.DataFrame:
+        """
+        GeoNames first level administrative divisions (admin1CodesASCII.txt), downloaded and read on first access.
+        """
+        self.download_files([self.data_dir + 'admin1CodesASCII.txt'])
+        return pd.read_csv(str(self.data_dir) + 'admin1CodesASCII.txt', sep='\t', header=None,
+            names=['code', 'state', 'state_ascii', 'geonameid'])
+
+    @cached_property
+    def cybersecurity_df(self) -> pd.DataFrame:
+        """
+        Original attacks dataset, downloaded and read on first access.
+
+        Typed and mirrored as parquet for warm starts. Every run reads it, from
+        the parquet mirror when the CSV did not change, since the step keys hash
+        the input columns of the steps.
+        """
+        self.download_files([self.data_dir + 'cybersecurity_attacks.csv'])
+        return read_attacks(str(self.data_dir) + "cybersecurity_attacks.csv")
+
     def find_city_coords(self, cities: dict, city: str, state: str) -> list[str] | None:
         """
         Find coordinates for a city by trying different city-state combinations.
@@ -171,7 +255,8 @@ class EDA():
                 - Header Diff: Calculated transport header size
                 - Valid Headers: Boolean indicating if header_diff is within expected range
                 - Payload Min/Max Diff: Difference from max allowed payload size
-            - Prints validation statistics to stdout
+            - Prints validation statistics to stdout, the full frames and Series
+              if self.verbose
 
         Notes:
             - Invalid packets may indicate data corruption, truncation, or anomalies
@@ -183,20 +268,17 @@ class EDA():
             self.cybersecurity_df[["Payload Data", "Packet Length", "Packet Type", "Protocol"]]
         )
 
-        # Maximum payload sizes per protocol (min, max) in bytes
-        # Based on standard MTU of 1500 bytes minus all headers
-        payload_data_max = {
-            'TCP': (1402, 1442),   # Range due to variable TCP header (20-60 bytes)
-            'UDP': (1454, 1454),   # Fixed: 1500 - 18 (eth) - 20 (ip) - 8 (udp)
-            'ICMP': (1454, 1454)   # Fixed: 1500 - 18 (eth) - 20 (ip) - 8 (icmp)
-        }
-
-        # Transport layer header sizes per protocol (min, max) in bytes
-        headers = {
-            'TCP': (20, 60),   # 20 bytes base + up to 40 bytes options
-            'UDP': (8, 8),     # Fixed: src_port(2) + dst_port(2) + length(2) + checksum(2)
-            'ICMP': (8, 8)     # Fixed: type(1) + code(1) + checksum(2) + header_data(4)
-        }
+        # Size limits per protocol in bytes, one row per protocol
+        # payload: maximum payload size (min, max), based on standard MTU of 1500 bytes minus all headers
+        # header: transport layer header size (min, max)
+        protocol_limits = pd.DataFrame.from_dict({
+            # Range due to variable TCP header: 20 bytes base + up to 40 bytes options
+            'TCP': {'payload_min': 1402, 'payload_max': 1442, 'header_min': 20, 'header_max': 60},
+            # Fixed: 1500 - 18 (eth) - 20 (ip) - 8 (udp), header src_port(2) + dst_port(2) + length(2) + checksum(2)
+            'UDP': {'payload_min': 1454, 'payload_max': 1454, 'header_min': 8, 'header_max': 8},
+            # Fixed: 1500 - 18 (eth) - 20 (ip) - 8 (icmp), header type(1) + code(1) + checksum(2) + header_data(4)
+            'ICMP': {'payload_min': 1454, 'payload_max': 1454, 'header_min': 8, 'header_max': 8},
+        }, orient='index')
 
         # Fixed header sizes (constant across all packets)
         ethernet_frame_length = 18  # 14 bytes header + 4 bytes FCS (Frame Check Sequence)
@@ -210,19 +292,22 @@ class EDA():
         # header_diff should equal the transport layer header size if packet is valid
         header_diff = packet_lengths - (payload_lengths + ethernet_frame_length + ip_header_length)
 
+        # Gather the limits of every row with one take on the Protocol category codes: the table
+        # is reordered like the categories, and unknown or missing protocols (code -1) take a
+        # trailing row of zeros
+        protocols = df_payload_analysis['Protocol'].astype('category')
+        limits = protocol_limits.reindex(protocols.cat.categories, fill_value=0)
+        limits = np.vstack([limits.to_numpy(), np.zeros((1, len(limits.columns)), dtype=int)])
+        bounds = pd.DataFrame(limits.take(protocols.cat.codes.to_numpy(), axis=0),
+                              columns=protocol_limits.columns, index=df_payload_analysis.index)
+
         # Calculate how much room remains for payload vs maximum allowed
-        payload_min_diff = df_payload_analysis['Protocol'].map(
-            lambda x: payload_data_max.get(x, (0, 0))[0]
-        ) - payload_lengths
-        payload_max_diff = df_payload_analysis['Protocol'].map(
-            lambda x: payload_data_max.get(x, (0, 0))[1]
-        ) - payload_lengths
+        payload_min_diff = bounds['payload_min'] - payload_lengths
+        payload_max_diff = bounds['payload_max'] - payload_lengths
 
         # Sum of all known fixed-size components (for debugging)
         sum_known_part_ethernet_packet = payload_lengths + ethernet_frame_length + ip_header_length
 
-        print(f"sum of known parts of ethernet packet: {sum_known_part_ethernet_packet}")
-
         # Insert calculated columns before 'Payload Data' for better readability
         df_payload_analysis.insert(
             df_payload_analysis.columns.get_loc("Payload Data"),
@@ -235,17 +320,9 @@ class EDA():
             header_diff
         )
 
-        print(f"payload are: {payload_lengths}\n\n")
-        print(f"packet length are: {packet_lengths}\n\n")
-        print(f"Header diff are: {header_diff}\n\n")
-
-        # Get expected header size range for each row's protocol
-        min_headers = df_payload_analysis['Protocol'].map(lambda p: headers.get(p, (0, 0))[0])
-        max_headers = df_payload_analysis['Protocol'].map(lambda p: headers.get(p, (0, 0))[1])
-
         # Validate: header_diff should fall within the expected range for the protocol
         # If outside range, packet structure doesn't match expected format
-        is_valid_headers = (header_diff >= min_headers) & (header_diff <= max_headers)
+        is_valid_headers = (header_diff >= bounds['header_min']) & (header_diff <= bounds['header_max'])
 
         # Add validation and difference columns to the analysis DataFrame
         df_payload_analysis.insert(
@@ -264,87 +341,76 @@ class EDA():
             payload_max_diff
         )
 
-        # Report validation results - packets with valid header sizes
-        print(f"Valid packets: {len(df_payload_analysis[is_valid_headers])}")
-        print(df_payload_analysis[is_valid_headers][:])
-
-        # Identify and display packets that failed validation
+        # Identify packets that failed validation
         # These may indicate data quality issues or anomalous traffic
         invalid_headers = df_payload_analysis[~is_valid_headers]
-        print(f"Invalid packets len: {len(invalid_headers)}")
-        print(invalid_headers)
-        
-        pa = PayloadAnalyzer(self.cybersecurity_df, payload_col="Payload Data")
-        pa_is_lorem = df_payload_analysis['Payload Data'].apply(lambda x: pa.is_lorem_ipsum(payload_text=x))
-        
-        print(pa_is_lorem.value_counts())
-        
-        df_payload_analysis['Payload Data Translated'] = df_payload_analysis['Payload Data'].apply(lambda x: pa.payload_translate(payload_text=x))
+        if self.verbose:
+            print(f"sum of known parts of ethernet packet: {sum_known_part_ethernet_packet}")
+            print(f"payload are: {payload_lengths}\n\n")
+            print(f"packet length are: {packet_lengths}\n\n")
+            print(f"Header diff are: {header_diff}\n\n")
+            # Report validation results - packets with valid header sizes
+            print(f"Valid packets: {len(df_payload_analysis[is_valid_headers])}")
+            print(df_payload_analysis[is_valid_headers][:])
+            print(f"Invalid packets len: {len(invalid_headers)}")
+            print(invalid_headers)
+        else:
+            print(pd.DataFrame({
+                'payload length': payload_lengths,
+                'packet length': packet_lengths,
+                'known parts': sum_known_part_ethernet_packet,
+                'header diff': header_diff,
+            }).describe())
+            print(f"Valid packets: {is_valid_headers.sum()}, invalid packets: {len(invalid_headers)}")
+            print(pd.crosstab(protocols, is_valid_headers.rename('Valid Headers')))
+        
+        translator = Translator(self.translation_backend, cache_path=self.data_dir + "translation_cache.parquet",
+                                max_workers=self.translation_workers)
+        pa = PayloadAnalyzer(self.cybersecurity_df, payload_col="Payload Data", translator=translator)
+        # Analyse each distinct payload once, the results are broadcast back to the rows
+        codes, payloads = pa.deduplicate(df_payload_analysis['Payload Data'])
+        distinct = pd.DataFrame(index=payloads.index)
+        distinct['Payload Language'] = pa.detect_payload_languages(payloads)
+        distinct['Lorem Markers'] = pa.lorem_marker_counts(payloads)
+        distinct['Lorem Ipsum'] = distinct['Lorem Markers'] >= LOREM_MIN_MARKERS
+        distinct = distinct.join(pa.payload_features(payloads).add_prefix('payload_'))
+        distinct = distinct.join(pa.detect_obfuscation(payloads).add_prefix('payload_'))
+        distinct = distinct.join(pa.scan_signatures(payloads, self.signature_scanner).add_prefix('payload_'))
+        # Lorem Ipsum payloads are placeholder text, there is nothing to translate
+        distinct['Payload Data Translated'] = pa.translate_payloads(payloads, skip=distinct['Lorem Ipsum'])
+        df_payload_analysis = df_payload_analysis.join(pa.broadcast(distinct, codes, df_payload_analysis.index))
+
+        print(df_payload_analysis['Payload Language'].value_counts())
+        print(df_payload_analysis['Lorem Ipsum'].value_counts())
+        print(df_payload_analysis.filter(like='payload_').describe())
+        print(f"Payloads with encoded segments: {df_payload_analysis['payload_obfuscated'].sum()}")
+        print(f"Payloads matching a signature: {df_payload_analysis['payload_signatures'].notna().sum()}")
+        print(df_payload_analysis['payload_signatures'].str.split(',').explode().value_counts())
         # Persist analysis results for further investigation
         df_payload_analysis.to_parquet(self.data_dir + "ds_payload_analysis.parquet")
 
 
-    def city_state_to_coords(self, cities: dict, cities_states: str) -> pd.Series:
-        """
-        Convert a city-state string to latitude and longitude coordinates.
-
-        Parses a comma-separated city-state string, looks up the city in the
-        provided dictionary, and returns coordinates as a pandas Series.
-
-        Args:
-            cities (dict): Dictionary mapping city names to coordinate dictionaries
-                containing 'lat' and 'lon' keys.
-            cities_states (str): Comma-separated string in format "City, State".
-
-        Returns:
-            pd.Series: Series containing [latitude, longitude]. Returns [None, None]
-                if the city is not found or if an error occurs during parsing.
-
-        Example:
-            coords = self.city_state_to_coords(cities_dict, "Mumbai, Maharashtra")
-            # Returns pd.Series([19.0760, 72.8777])
-        """
-        try:
-            city = cities_states.split(', ')[0]
-            coords = cities.get(city)
-            if coords:
-                return pd.Series([coords['lat'], coords['lon']])
-            return pd.Series([None, None])
-        except Exception as e:
-            print(f"error {e}")
-            return pd.Series([None, None])
-        
-    def clean_geolocation_column(self) -> None:
+    def build_gazetteer(self) -> Gazetteer:
         """
+        Build the geocoding gazetteer from the GeoNames dumps.
 
         This method performs:
 
         1. Merges Indian administrative regions with city data
         2. Analyzes and cleans population data
         3. Removes outliers and duplicates based on population thresholds
-        4. Creates city-based lookup dictionaries for geocoding
-        5. Attempts geocoding using multiple strategies:
-           - Exact city-state matching
-           - City-only matching (highest population)
-           - Alternate names matching
-           - Historical names matching
-        6. Exports processed geographic data and missing data to parquet files
+        4. Adds the alternate and historical names of the remaining cities
 
         Args:
             None
 
         Returns:
-            None
+            Gazetteer: gazetteer of the current GeoNames release
 
         Side Effects:
             - Modifies self.india_df and self.admin_df
-            - Creates parquet files: 'india_cities.parquet', 'geo_data.parquet',
-              'missing_data.parquet'
-            - Prints extensive analysis output including statistics, missing values,
-              and processing time
-
-        Performance:
-            Prints total execution time at completion.
+            - Creates parquet file 'india_cities.parquet'
+            - Prints extensive analysis output about population and missing states
         """
         self.admin_df = self.admin_df[self.admin_df['code'].str.startswith('IN.')]
         self.admin_df['admin1_code'] = self.admin_df['code'].str.split('.').str[1]
@@ -402,91 +468,115 @@ class EDA():
 
         self.india_df.to_parquet(str(self.data_dir) + 'india_cities.parquet')
 
-        column_names = ["Geolocation Lat", "Geolocation Long"]
+        # Load alternate names (this file is large, filter for India geonameids)
+        india_ids = set(self.india_df['geonameid'])
 
-        df_geo_data = pd.DataFrame(self.cybersecurity_df["Geo-location Data"])
-        for i in range(len(column_names)):
-            df_geo_data.insert( i , column_names[i] , value = np.nan )
-            print(f"Inserting column {column_names[i]}")
-        print(df_geo_data.head())
+        # load alternate names con flag storico, streamed and filtered per India while reading
+        alt_names = load_alternate_names(self.data_dir + 'alternateNamesV2.txt', india_ids,
+            cache_path=self.data_dir + 'alternateNamesV2_IN.parquet')
 
-        # Check how many are missing
-        total = len(df_geo_data)
-        missing = df_geo_data["Geolocation Lat"].isna().sum()
-        print(f"Missing: {missing}/{total} ({100*missing/total:.1f}%)")
+        return Gazetteer.build(self.india_df, alt_names, self.gazetteer_version())
 
-        # See which cities aren't being found
-        df_geo_data["city_state"] = self.cybersecurity_df["Geo-location Data"]
-        not_found = df_geo_data[df_geo_data["Geolocation Lat"].isna()]["city_state"].value_counts()
-        print("\n=== Top 30 cities not found ===")
-        print(not_found.head(30))
+    def gazetteer_version(self) -> str:
+        """
+        Version of the gazetteer built from the current GeoNames files and parameters.
+        """
+        return Gazetteer.release_version(self.required_files, {'max_city_population': self.max_city_population})
 
-        # Rebuild lookup with just city names (keep highest population for duplicates)
-        city_only = self.india_df.sort_values('population', ascending=False).drop_duplicates(subset=['name'], keep='first')
-        cities_by_name = city_only.set_index('name')[['lat', 'lon', 'state', 'population']].to_dict('index')
-        # Re-run geocoding
-        df_geo_data[["Geolocation Lat", "Geolocation Long"]] = self.cybersecurity_df["Geo-location Data"].apply(
-            lambda x: self.city_state_to_coords(cities_by_name, x)
-        )
+    def load_gazetteer(self) -> Gazetteer:
+        """
+        Load the gazetteer of the current GeoNames release, building it on first use.
 
-        # Check again
-        missing = df_geo_data["Geolocation Lat"].isna().sum()
-        print(f"Missing after city-only matching: {missing}/{len(df_geo_data)} ({100*missing/len(df_geo_data):.1f}%)")
+        The gazetteer file is versioned by the GeoNames dump files and the
+        parameters it is built from, so a new release or a new
+        max_city_population triggers exactly one rebuild.
 
-        # Check what's still not found
-        not_found = df_geo_data[df_geo_data["Geolocation Lat"].isna()]["city_state"].apply(
-            lambda x: x.split(', ')[0]
-        ).value_counts()
+        Args:
+            None
 
-        print(f"Unique cities not found: {len(not_found)}")
-        print("\n=== Top 30 cities still missing ===")
-        print(not_found.head(30))
+        Returns:
+            Gazetteer: gazetteer of the current GeoNames release
+        """
+        self.download_files(self.required_files)
+        version = self.gazetteer_version()
+        path = Gazetteer.path_for(self.data_dir, version)
+        if path.exists():
+            print(f"Loading gazetteer {path}")
+            return Gazetteer.load(path)
+
+        gazetteer = self.build_gazetteer()
+        print(f"Saving gazetteer {path} ({len(gazetteer.table)} names)")
+        gazetteer.save(path)
+        return gazetteer
 
-        # Load alternate names (this file is large, filter for India geonameids)
-        india_ids = set(self.india_df['geonameid'])
+    def clean_geolocation_column(self) -> None:
+        """
 
-        # load alternate names con flag storico
-        alt_names = pd.read_csv(self.data_dir + '/alternateNamesV2.txt', sep='\t', header=None,
-            usecols=[1, 3, 7],
-            names=['geonameid', 'alt_name', 'is_historic'],
-            dtype={'is_historic': str}
-        )
+        This method performs:
 
-        # filter per India
-        alt_names = alt_names[alt_names['geonameid'].isin(india_ids)]
+        1. Loads (or builds once per GeoNames release) the geocoding gazetteer
+        2. Geocodes the distinct locations with a single tiered join on the gazetteer:
+           - Exact city-state matching
+           - City-only matching (highest population)
+           - Alternate and historical names matching
+           - Fuzzy matching of the remaining city names (trigram index)
+        3. Reports the number of rows resolved by each tier
+        4. Exports processed geographic data and missing data to parquet files
 
-        # Crea lookup che include ANCHE i nomi storici
-        alt_names_all = alt_names.merge(
-            self.india_df[['geonameid', 'lat', 'lon', 'population']], 
-            on='geonameid'
-        )
+        Args:
+            None
 
-        # Aggiungi al lookup combinato
-        alt_lookup = (alt_names_all
-            .sort_values('population', ascending=False)
-            .drop_duplicates(subset='alt_name', keep='first')
-            .set_index('alt_name')[['lat', 'lon']]
-            .to_dict('index'))
+        Returns:
+            None
 
-        cities_combined = {**alt_lookup, **cities_by_name}
+        Side Effects:
+            - Creates parquet files: 'geo_data.parquet', 'missing_data.parquet'
+            - Prints extensive analysis output including statistics, missing values,
+              and processing time
 
-        print(f"Total Lookup (with historical names): {len(cities_combined)}")
+        Performance:
+            Prints total execution time at completion.
+        """
+        gazetteer = self.load_gazetteer()
 
-        df_geo_data[["Geolocation Lat", "Geolocation Long"]] = self.cybersecurity_df["Geo-location Data"].apply(
-            lambda x: self.city_state_to_coords(cities_combined, x)
-        )
+        start_t = time.perf_counter()
+        df_geo_data = pd.DataFrame(self.cybersecurity_df["Geo-location Data"])
+        df_geo_data["city_state"] = self.cybersecurity_df["Geo-location Data"]
 
+        # Geocode every distinct "City, State" once: (city, state) -> city -> alternate names -> fuzzy
+        coords, tier_hits = gazetteer.geocode(self.cybersecurity_df["Geo-location Data"],
+                                              fuzzy_threshold=self.fuzzy_threshold)
+        df_geo_data.insert(0, "Geolocation Lat", coords["lat"])
+        df_geo_data.insert(1, "Geolocation Long", coords["lon"])
+        df_geo_data["Geolocation Tier"] = coords["tier"]
+        df_geo_data["Geolocation Match"] = coords["match"]
+        df_geo_data["Geolocation Score"] = coords["score"]
+
+        total = len(df_geo_data)
+        print("=== Geocoding hits per tier ===")
+        for tier, hits in tier_hits.items():
+            print(f"{tier:<12} {hits:>8} ({100*hits/total:.1f}%)")
+
+        fuzzy = df_geo_data[df_geo_data["Geolocation Tier"] == "fuzzy"]
+        fuzzy_matches = (fuzzy.assign(city=fuzzy["city_state"].str.split(', ').str[0])
+            .groupby(["city", "Geolocation Match", "Geolocation Score"]).size()
+            .rename("rows").sort_values(ascending=False))
+        print(f"\n=== Fuzzy matches (threshold {self.fuzzy_threshold}): {len(fuzzy_matches)} names ===")
+        print(fuzzy_matches.head(30).to_string())
 
-        alt_names = pd.read_csv(self.data_dir + 'alternateNamesV2.txt', sep='\t', header=None,
-            usecols=[1, 3, 7],  # geonameid, alt_name, isHistoric
-            names=['geonameid', 'alt_name', 'is_historic']
-        )
-        
         # Include both current and historic names
-        historic_names = alt_names[alt_names['is_historic'] == 1]
+        historic_names = gazetteer.table[gazetteer.table['kind'] == 'historic']
         print(f"Hystoric name found: {len(historic_names)}")
+
+        # Check what's still not found
+        not_found = df_geo_data.loc[df_geo_data["Geolocation Lat"].isna(), "city_state"].str.split(', ').str[0].value_counts()
+        print(f"Unique cities not found: {len(not_found)}")
+        print("\n=== Top 30 cities still missing ===")
+        print(not_found.head(30))
+
         missing = df_geo_data["Geolocation Lat"].isna().sum()
-        print(f"Missing: {missing}/{len(df_geo_data)} ({100*missing/len(df_geo_data):.1f}%)")
+        print(f"Missing: {missing}/{total} ({100*missing/total:.1f}%)")
+        print(f"Geocoding time: {time.perf_counter() - start_t:.2f} s")
 
         # Create boolean mask: True where Lat is missing (NaN)
         missing_mask = df_geo_data["Geolocation Lat"].isna()
@@ -508,41 +598,17 @@ class EDA():
         """
         This function splits the Timestamp column in to two columns for date and time.
         Can optionally drop the column if drop original column is set to True (to be implemented)
-        
+
+        The split is vectorized: Day is the datetime64 day (timestamp at midnight)
+        and Time the int32 number of seconds since midnight. If
+        self.datetime_features is True, the Hour and Weekday columns are added too.
         """
-        
-        self.cybersecurity_df.Timestamp = self.cybersecurity_df.Timestamp.apply(pd.to_datetime)
-        
-        print(self.cybersecurity_df)
-        self.cybersecurity_df['Day'] = [d.date() for d in self.cybersecurity_df['Timestamp']]
-        self.cybersecurity_df['Time'] = [d.time() for d in self.cybersecurity_df['Timestamp']]
+        features = split_datetime(self.cybersecurity_df["Timestamp"], format=self.timestamp_format,
+                                  extra=self.datetime_features)
+        for col in features.columns:
+            self.cybersecurity_df[col] = features[col]
         print(self.cybersecurity_df)
-        
-        
-        
-    def update_filename(self):
-        """
-        Updates the filename of the dataset parquet file each time is called.
-        Ideally should be called after each (major) step of EDA or cleaning        
-        """
-        filename = self.dsbasename + self.step_short + self.ext
-        self.dsfile_relative_path = self.data_dir + filename
 
-    def load_file_from_step(self) -> None:
-        """
-        Checks the existence and loads a file for the given step of the analysis        
-        """
-        if self.run_full_analysis:
-            pass
-        else:
-            try:
-                f = self.data_dir + self.dsbasename + self.step_short + self.ext
-                Path(f).exists()
-                self.cybersecurity_df = pd.read_parquet(f)
-            except FileExistsError:
-                print(f"file {f} does not exist")
-                pass
-            
     def print_step_artwork(self, beginning=True):
         
         """
@@ -566,164 +632,37 @@ class EDA():
         Sets values of internal dict self.steps_to_skip according to steps_to_skips values
         Intended to be used to skip certain parts of the analysis by setting values of the passed dict to True
         """
-        
-        for k,v in self.steps_to_skip:
-            for key, val in analysis_steps:
-                if k == key and v != val:
-                    v = val
-                else:
-                    pass
-                
-    def get_skip_step(self, current_step: str) -> bool:
-        
-        """
-        Gets current_step as input and tests if the step needs to be skipped. If the
-        step is not in self.steps_to_skips dict calls add.step with current step as parameter
-        to add it to steps to be skipped for the next execution.
-        Returns:
-            bool : True if the step has already run or if it set to be skipped False otherwise
-        """
-        if current_step in self.steps_to_skip.keys():
-            return self.steps_to_skip[current_step]
-        else:
-            self.add_step(current_step)
-            return False
-    
-    def add_step(self, step: str):
-        """
-        Adds step to self.steps_to_skip if not already present in it
+        for step, skip in analysis_steps.items():
+            if step in self.steps_to_skip:
+                self.steps_to_skip[step] = skip
 
-        Args:
-            step (str): name of the step of the analysis passed as argument
+    def load_settings(self) -> None:
         """
-        if step in self.steps_to_skip.keys():
-            pass
-        else:
-            self.steps_to_skip[step]= True
-    
-    def get_next_step(self):
-        """
-        Gets the next step of the analysis to be run based on the self.steps_to_skip dict
-        """
-        print(f"current step is: {self.step_short}")
-        try:
-            for k, v in self.steps_to_skip.items():
-                if v:
-                    print(f"skipped step is {k}")
-                    pass
-                else:
-                    print(f"next running step is {k}")
-                    return k
-        except KeyError as e:
-            print(e)
-            exit(1)
-            
-                
-    def get_first_step(self) -> str:
-        """
-        Gets the first step of the analysis set in the settings json
-
-        Returns:
-            str: the first step of the analysis as a string
+        Loads the steps to skip set in the settings json.
+        A skipped step reuses its last checkpoint instead of running,
+        even if it was computed from other code or inputs, so the shipped
+        settings skip no step and stale checkpoints are never reused by default.
         """
         with open("settings/settings.json") as f:
             settings = json.loads(f.read())
         print(settings)
         self.steps_to_skip = settings["steps_to_skip"]
-        if not any(self.steps_to_skip.values()):
-            self.run_full_analysis = True
-            return "_step1"
-        else:
-            for k, v in self.steps_to_skip.items():
-                if not v:
-                    step_to_run = k
-                    break
-                else:
-                    continue
-            return step_to_run
-            
-                        
-    def run_EDA(self):
-        
+
+    def run_EDA(self, force: bool = False, from_step: str | None = None):
+        """
+        Runs the steps of the analysis in dependency order, concurrently when
+        they are independent, reusing the checkpoints still valid for the
+        current code, parameters and inputs of each step.
+
+        Args:
+            force (bool): Runs all the steps, ignoring the checkpoints.
+            from_step (str | None): Runs this step and the steps depending on it,
+                ignoring their checkpoints.
+        """
         start_t = time.time()
-        
-        match self.step_short:
-            case "_step1":
-                if not self.get_skip_step(self.step_short):
-                    #Step 1
-                    self.step_long = "Step #1 cleaning of the geolocation column"
-                    self.print_step_artwork()
-
-                    self.clean_geolocation_column()
-                    
-                    self.update_filename()
-                    
-                    print(f"Saving file {self.dsfile_relative_path}")
-
-                    self.cybersecurity_df.to_parquet( self.dsfile_relative_path)
-                    
-                    self.print_step_artwork(beginning=False)
-                    self.steps_to_skip[self.step_short] = True
-                    self.step_short = self.get_next_step()
-                    self.run_EDA()
-                else:                    
-                    self.steps_to_skip[self.step_short] = True
-                    self.load_file_from_step()
-                    self.step_short = self.get_next_step()
-                    self.run_EDA()    
-                    
-            case "_step2": 
-                if not self.get_skip_step(self.step_short):
-                    self.step_long = "Step #2 split Timestamp column"
-                    self.print_step_artwork()
-                    #Step2
-                    self.split_datetime_column()
-                    
-                    self.update_filename()
-                    
-                    print(f"Saving file {self.dsfile_relative_path}")
-
-                    self.cybersecurity_df.to_parquet( self.dsfile_relative_path)
-                    
-                    self.print_step_artwork(beginning=False)
-                    self.steps_to_skip[self.step_short] = True
-                    self.step_short = self.get_next_step()
-                    self.run_EDA()
-                else:
-                    self.steps_to_skip[self.step_short] = True
-                    self.load_file_from_step()
-                    self.step_short = self.get_next_step()
-                    self.run_EDA()
-                    
-            case "_step3":
-                if not self.get_skip_step(self.step_short):
-                    self.step_long = "Step #3 count bytes in payload data and subtract it from packet length to test if gives the header length of the corresponding "
-                    self.print_step_artwork()
-                    #Step3
-                    self.analyse_payload_column()
-                    
-                    self.update_filename()
-                    
-                    print(f"Saving file {self.dsfile_relative_path}")
-
-                    self.cybersecurity_df.to_parquet( self.dsfile_relative_path)
-                    
-                    self.print_step_artwork(beginning=False)
-                    self.steps_to_skip[self.step_short] = True
-                    self.step_short = self.get_next_step()
-                    self.run_EDA()
-                else:
-                    self.steps_to_skip[self.step_short] = True
-                    self.load_file_from_step()
-                    self.step_short = self.get_next_step()
-                    self.run_EDA()
-                    
-            case _:
-                
-                print("Default case")
-        
-        
+
+        StepExecutor(self, self.steps, force=force, from_step=from_step, max_workers=self.max_workers).run()
+
         tot_t = time.time()
 
-        
-        print(f"total run time = {tot_t - start_t}")
\ No newline at end of file
+        print(f"total run time = {tot_t - start_t}")
@@ -0,0 +1,44 @@
+import pandas as pd
+
+# Format of the Timestamp column of cybersecurity_attacks.csv, e.g. 2023-05-30 06:33:58
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def split_datetime(timestamps: pd.Series, format: str = TIMESTAMP_FORMAT, extra: bool = False) -> pd.DataFrame:
+    """
+    Split a timestamp column into a day column and a time of day column.
+
+    Strings are parsed in a single vectorized pd.to_datetime call with an
+    explicit format, and the features are computed with the .dt accessor, so
+    no Python object is created per row.
+
+    Args:
+        timestamps (pd.Series): Timestamps, as strings in the given format or
+            already as datetime64.
+        format (str): strptime format of the strings.
+        extra (bool): Also derive the Hour and Weekday columns.
+
+    Returns:
+        pd.DataFrame: DataFrame indexed like timestamps with columns Timestamp
+            (datetime64), Day (datetime64 at midnight), Time (int32 seconds
+            since midnight, nullable Int32 if some timestamps are missing) and,
+            if extra, Hour (int8) and Weekday (int8, Monday is 0).
+
+    Example:
+        df[["Timestamp", "Day", "Time"]] = split_datetime(df["Timestamp"])
+    """
+    if not pd.api.types.is_datetime64_any_dtype(timestamps):
+        timestamps = pd.to_datetime(timestamps, format=format)
+
+    # Missing timestamps need the nullable integer types
+    missing = timestamps.isna().any()
+    day = timestamps.dt.normalize()
+    features = pd.DataFrame({
+        "Timestamp": timestamps,
+        "Day": day,
+        "Time": ((timestamps - day) // pd.Timedelta(seconds=1)).astype("Int32" if missing else "int32"),
+    })
+    if extra:
+        features["Hour"] = timestamps.dt.hour.astype("Int8" if missing else "int8")
+        features["Weekday"] = timestamps.dt.weekday.astype("Int8" if missing else "int8")
+    return features
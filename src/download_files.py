@@ -1,22 +1,38 @@
-import subprocess
+import hashlib
+import json
+import shutil
+import tempfile
+import threading
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
+import requests
+
 
 class GetFiles():
     """
     A utility class for downloading and extracting files from remote URLs.
 
-    This class handles downloading files using curl, automatically extracting
-    ZIP archives, and managing the data directory structure. It is designed
-    to download multiple files from a dictionary of filename-URL pairs.
+    This class downloads files concurrently over HTTP, resumes partial
+    downloads with range requests, skips files that did not change on the
+    server (ETag / Last-Modified / size) and extracts only the needed members
+    of ZIP archives by streaming them to disk. It is designed to download
+    multiple files from a dictionary of filename-URL pairs.
 
     Attributes:
         data_dir (Path): The directory where files will be downloaded and extracted.
         files (dict): Dictionary mapping filenames to their download URLs.
+        members (dict): Dictionary mapping ZIP filenames to the members to extract.
+        max_workers (int): Number of concurrent downloads.
     """
 
-    def __init__(self, files_to_download: dict, data_directory: Path) -> None:
+    chunk_size = 1 << 20  # 1 MiB per read/write
+    timeout = 60  # seconds without data before a download is abandoned
+
+    def __init__(self, files_to_download: dict, data_directory: Path,
+                 members: dict | None = None, max_workers: int = 4) -> None:
         """
         Initialize the GetFiles class and begin the download process.
 
@@ -28,6 +44,9 @@ class GetFiles():
                 are URLs to download from.
             data_directory (Path): Path object representing the directory where files
                 should be saved.
+            members (dict | None): Dictionary where keys are ZIP filenames and values
+                are the lists of members to extract. ZIPs not listed are fully extracted.
+            max_workers (int): Number of files downloaded concurrently.
 
         Returns:
             None
@@ -37,23 +56,25 @@ class GetFiles():
                 'data.csv': 'https://example.com/data.csv',
                 'archive.zip': 'https://example.com/archive.zip'
             }
-            downloader = GetFiles(files, Path('data'))
+            downloader = GetFiles(files, Path('data'), members={'archive.zip': ['data.txt']})
         """
         # Create data directory
         self.data_dir = data_directory
         self.data_dir.mkdir(parents=True, exist_ok=True)
-        
+
         self.files = files_to_download
-        
+        self.members = members or dict()
+        self.max_workers = max_workers
+
         self._get_files()
 
     def _get_files(self) -> None:
         """
         Download files from URLs and extract ZIP archives.
 
-        This private method iterates through all files in the files dictionary,
-        downloads each file using curl, and automatically extracts any ZIP files.
-        After extraction, the original ZIP file is removed to save space.
+        This private method downloads all files in the files dictionary
+        concurrently with a thread pool, and automatically extracts any ZIP
+        files. After extraction, the original ZIP file is removed to save space.
         Displays a summary of all downloaded files with their sizes.
 
         Args:
@@ -62,34 +83,292 @@ class GetFiles():
         Returns:
             None
 
-        Raises:
-            subprocess.CalledProcessError: If curl download fails, the error is caught
-                and logged, but execution continues for remaining files.
-
         Side Effects:
             - Downloads files to self.data_dir
             - Extracts ZIP archives
             - Removes ZIP files after extraction
+            - Writes a hidden .<filename>.meta.json file per download
             - Prints download progress and file listing
         """
-        for filename, url in self.files.items():
-            filepath = self.data_dir / filename
-            
-            # Download with curl
-            print(f"Downloading {filename}...")
-            try:
-                subprocess.run(['curl', '-L', '-o', str(filepath), url], check=True)
-            except subprocess.CalledProcessError as e:
-                print(f"Failed to download {filename} from {url}. Error: {e}")
-                continue
-            
-            # Unzip if needed
-            if filename.endswith('.zip'):
-                print(f"Extracting {filename}...")
-                with zipfile.ZipFile(filepath, 'r') as z:
-                    z.extractall(self.data_dir)
-                filepath.unlink()  # remove zip after extraction
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(lambda item: self._get_file(*item), self.files.items()))
 
         print(f"\nDone! Files in {self.data_dir}:")
         for f in self.data_dir.iterdir():
-            print(f"  {f.name} ({f.stat().st_size / 1e6:.1f} MB)")
\ No newline at end of file
+            if not f.name.startswith('.'):
+                print(f"  {f.name} ({f.stat().st_size / 1e6:.1f} MB)")
+
+    def _get_file(self, filename: str, url: str) -> None:
+        """
+        Download a single file, resuming or skipping it when possible.
+
+        Args:
+            filename (str): Name of the file in the data directory.
+            url (str): URL to download it from.
+
+        Returns:
+            None
+
+        Raises:
+            requests.RequestException: Caught and logged, execution continues
+                for the remaining files.
+
+        Notes:
+            - A resumed download answered 416 (range not satisfiable) is
+              completed if the size in Content-Range (bytes */N) is the size of
+              the .part file, and downloaded again from scratch otherwise
+        """
+        filepath = self.data_dir / filename
+        partpath = self.data_dir / (filename + '.part')
+        meta = self._load_meta(filename)
+
+        headers = dict()
+        if meta.get('url') == url and self._outputs_present(filename, meta):
+            # Conditional request: the server answers 304 if the file did not change
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        elif meta.get('url') == url and partpath.exists() and (meta.get('etag') or meta.get('last_modified')):
+            # Resume the partial download, If-Range restarts it if the file changed meanwhile
+            headers['Range'] = f"bytes={partpath.stat().st_size}-"
+            headers['If-Range'] = meta.get('etag') or meta['last_modified']
+        else:
+            partpath.unlink(missing_ok=True)
+
+        try:
+            with requests.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                conditional = 'If-None-Match' in headers or 'If-Modified-Since' in headers
+                if response.status_code == 304 or (conditional and self._unchanged(response, meta)):
+                    print(f"{filename} is up to date, skipping download.")
+                    return
+                if response.status_code == 416 and 'Range' in headers:
+                    # Nothing left after the .part, which is complete if a run stopped before renaming it
+                    total = response.headers.get('Content-Range', '').rpartition('/')[2]
+                    if not (total.isdigit() and int(total) == partpath.stat().st_size):
+                        print(f"Cannot resume {filename}, downloading it again...")
+                        partpath.unlink()
+                        return self._get_file(filename, url)
+                    print(f"{filename} was already fully downloaded.")
+                else:
+                    response.raise_for_status()
+
+                    meta = {
+                        'url': url,
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified'),
+                        'size': None,
+                    }
+                    self._save_meta(filename, meta)
+
+                    if response.status_code == 206:
+                        print(f"Resuming {filename} from byte {partpath.stat().st_size}...")
+                        mode = 'ab'
+                    else:
+                        print(f"Downloading {filename}...")
+                        mode = 'wb'
+                    with open(partpath, mode) as f:
+                        for chunk in response.iter_content(chunk_size=self.chunk_size):
+                            f.write(chunk)
+        except requests.RequestException as e:
+            print(f"Failed to download {filename} from {url}. Error: {e}")
+            return
+
+        partpath.replace(filepath)
+        meta['size'] = filepath.stat().st_size
+
+        # Unzip if needed
+        if filename.endswith('.zip'):
+            meta['extracted'] = self._extract(filepath, self.members.get(filename))
+            filepath.unlink()  # remove zip after extraction
+        self._save_meta(filename, meta)
+
+    def _extract(self, filepath: Path, members: list | None) -> list:
+        """
+        Stream the requested members of a ZIP archive to the data directory.
+
+        Members are copied chunk by chunk, so even very large members are
+        never held in memory.
+
+        Args:
+            filepath (Path): Path of the ZIP archive.
+            members (list | None): Names of the members to extract, all if None.
+
+        Returns:
+            list: Names of the extracted members.
+        """
+        print(f"Extracting {filepath.name}...")
+        with zipfile.ZipFile(filepath, 'r') as z:
+            if members is None:
+                members = [info.filename for info in z.infolist() if not info.is_dir()]
+            for member in members:
+                target = self.data_dir / member
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with z.open(member) as src, open(target, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, self.chunk_size)
+        return members
+
+    def _outputs_present(self, filename: str, meta: dict) -> bool:
+        """
+        Check that the outputs of a previous complete download are still on disk.
+
+        Args:
+            filename (str): Name of the downloaded file.
+            meta (dict): Metadata saved by the previous download.
+
+        Returns:
+            bool: True if the extracted members (for ZIPs) or the file itself
+                (with the recorded size) exist.
+        """
+        if 'extracted' in meta:
+            return all((self.data_dir / member).exists() for member in meta['extracted'])
+        filepath = self.data_dir / filename
+        return meta.get('size') is not None and filepath.exists() and filepath.stat().st_size == meta['size']
+
+    @staticmethod
+    def _unchanged(response: requests.Response, meta: dict) -> bool:
+        """
+        Compare the validators of a full response with the saved metadata.
+
+        Used when the server ignores conditional request headers.
+
+        Args:
+            response (requests.Response): Response of the download request.
+            meta (dict): Metadata saved by the previous download.
+
+        Returns:
+            bool: True if ETag, Last-Modified and size all match.
+        """
+        if not response.ok:
+            return False
+        size = response.headers.get('Content-Length')
+        return (response.headers.get('ETag') == meta.get('etag')
+                and response.headers.get('Last-Modified') == meta.get('last_modified')
+                and (size is None or int(size) == meta.get('size')))
+
+    def _meta_path(self, filename: str) -> Path:
+        return self.data_dir / f".{filename}.meta.json"
+
+    def _load_meta(self, filename: str) -> dict:
+        """
+        Load the metadata of a previous download, empty if there is none.
+        """
+        try:
+            with open(self._meta_path(filename)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return dict()
+
+    def _save_meta(self, filename: str, meta: dict) -> None:
+        with open(self._meta_path(filename), 'w') as f:
+            json.dump(meta, f)
+
+
+class MockFileServer():
+    """
+    Local stand-in for a file server, to check GetFiles offline.
+
+    Serves files from memory on localhost from a background thread, with an
+    ETag and a Last-Modified date, answering conditional requests with 304
+    and range requests with 206, or 416 when the range starts at or after
+    the end of the file. The status codes it answered are kept in order.
+
+    Example:
+        with MockFileServer({'data.csv': b'a,b'}) as server:
+            GetFiles({'data.csv': server.url + 'data.csv'}, Path('data'))
+    """
+
+    last_modified = "Wed, 21 Oct 2015 07:28:00 GMT"
+
+    def __init__(self, files: dict, port: int = 0) -> None:
+        """
+        Args:
+            files (dict): File name -> content (bytes), served at /<file name>.
+            port (int): Port to listen on, 0 for any free port.
+
+        Returns:
+            None
+        """
+        self.files = files
+        self.statuses = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                content = server.files.get(self.path.lstrip('/'))
+                if content is None:
+                    return self.answer(404)
+                etag = f'"{hashlib.blake2b(content, digest_size=8).hexdigest()}"'
+                headers = {'ETag': etag, 'Last-Modified': server.last_modified}
+                if self.headers.get('If-None-Match') == etag:
+                    return self.answer(304, headers)
+                byte_range = self.headers.get('Range')
+                if byte_range and self.headers.get('If-Range', etag) in (etag, server.last_modified):
+                    start = int(byte_range.removeprefix('bytes=').rstrip('-'))
+                    if start >= len(content):
+                        return self.answer(416, {**headers, 'Content-Range': f"bytes */{len(content)}"})
+                    headers['Content-Range'] = f"bytes {start}-{len(content) - 1}/{len(content)}"
+                    return self.answer(206, headers, content[start:])
+                self.answer(200, headers, content)
+
+            def answer(self, status, headers=None, body=b''):
+                server.statuses.append(status)
+                self.send_response(status)
+                for key, value in (headers or dict()).items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "MockFileServer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def check_downloads() -> None:
+    """
+    Check the full (200), unchanged (304), resumed (206) and range not
+    satisfiable (416) download paths of GetFiles against a MockFileServer.
+
+    Raises:
+        AssertionError: If a path does not end with the served content.
+    """
+    content = bytes(range(256)) * 64
+    with MockFileServer({'data.bin': content}) as server, tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        files = {'data.bin': server.url + 'data.bin'}
+        filepath, partpath = data_dir / 'data.bin', data_dir / 'data.bin.part'
+
+        def run(part: bytes | None = None) -> list:
+            if part is not None:
+                # A previous run stopped with this .part, the metadata of the last download is kept
+                filepath.unlink(missing_ok=True)
+                partpath.write_bytes(part)
+            server.statuses.clear()
+            GetFiles(files, data_dir, max_workers=1)
+            assert filepath.read_bytes() == content and not partpath.exists()
+            return list(server.statuses)
+
+        assert run() == [200]
+        assert run() == [304]
+        assert run(content[:1000]) == [206]
+        assert run(content) == [416]
+        assert run(content + b'stale') == [416, 200]
+    print("Downloads: 200, 304, 206 and 416 paths OK")
+
+
+if __name__ == "__main__":
+    check_downloads()
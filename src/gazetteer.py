@@ -0,0 +1,232 @@
+import hashlib
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from src.trigram_index import TrigramIndex
+
+# Part of every gazetteer version, bumped when the gazetteer building code (Gazetteer.build
+# and EDA.build_gazetteer) changes what ends up in the table
+GAZETTEER_FORMAT = 1
+
+class Gazetteer():
+    """
+    Compact geocoding gazetteer built from a GeoNames release.
+
+    The gazetteer is a single table of place names (official, alternate and
+    historic) with their coordinates, state and population. It is built once
+    per GeoNames release and saved as an uncompressed Arrow IPC file, which is
+    memory-mapped when loaded so pipeline runs can start geocoding instantly.
+
+    Attributes:
+        table (pd.DataFrame): One row per (name, state, kind) with columns name,
+            state, lat, lon, population, geonameid and kind.
+        version (str): Identifier of the GeoNames release the table was built from.
+    """
+
+    columns = ['name', 'state', 'lat', 'lon', 'population', 'geonameid', 'kind']
+    kinds = ['primary', 'alternate', 'historic']
+    # Geocoding tiers, in the order they are tried
+    tiers = ['city_state', 'city', 'alternate', 'fuzzy', 'missing']
+
+    def __init__(self, table: pd.DataFrame, version: str) -> None:
+        """
+        Args:
+            table (pd.DataFrame): Gazetteer rows with the Gazetteer.columns columns.
+            version (str): Identifier of the GeoNames release.
+
+        Returns:
+            None
+        """
+        self.table = table
+        self.version = version
+
+    @classmethod
+    def build(cls, cities_df: pd.DataFrame, alt_names: pd.DataFrame, version: str) -> "Gazetteer":
+        """
+        Build the gazetteer from cleaned GeoNames cities and their alternate names.
+
+        Args:
+            cities_df (pd.DataFrame): Cleaned cities with columns geonameid, name,
+                lat, lon, state and population.
+            alt_names (pd.DataFrame): Alternate names with columns geonameid,
+                alt_name and is_historic, as returned by load_alternate_names().
+            version (str): Identifier of the GeoNames release.
+
+        Returns:
+            Gazetteer: The built gazetteer. For every (name, state, kind) only the
+                most populated place is kept.
+        """
+        places = cities_df[['geonameid', 'state', 'lat', 'lon', 'population']]
+        primary = cities_df[['name']].join(places).assign(kind='primary')
+        alternate = (alt_names
+            .merge(places, on='geonameid')
+            .rename(columns={'alt_name': 'name'})
+            .assign(kind=lambda df: np.where(df['is_historic'] == 1, 'historic', 'alternate')))
+
+        table = (pd.concat([primary, alternate[primary.columns]], ignore_index=True)
+            .sort_values('population', ascending=False, kind='stable')
+            .drop_duplicates(subset=['name', 'state', 'kind'], keep='first')
+            .reset_index(drop=True))
+        table['kind'] = pd.Categorical(table['kind'], categories=cls.kinds)
+        return cls(table[cls.columns], version)
+
+    @staticmethod
+    def release_version(source_paths: list, params: dict | None = None) -> str:
+        """
+        Identify a gazetteer from the GeoNames files and the parameters it is built with.
+
+        Only file names, sizes and modification times are read, never the
+        content. GAZETTEER_FORMAT is part of the version too.
+
+        Args:
+            source_paths (list): Paths of the GeoNames dump files.
+            params (dict | None): Parameters of the build, e.g. the maximum city population.
+
+        Returns:
+            str: Short hexadecimal identifier of the gazetteer.
+        """
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(f"gazetteer format {GAZETTEER_FORMAT};".encode())
+        for path in map(Path, source_paths):
+            stat = path.stat()
+            digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        for name, value in sorted((params or dict()).items()):
+            digest.update(f"{name}={value!r};".encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def path_for(data_dir: str | Path, version: str, country: str = 'IN') -> Path:
+        """
+        Path of the gazetteer file of a release.
+        """
+        return Path(data_dir) / f"gazetteer_{country}_{version}.arrow"
+
+    def save(self, path: str | Path) -> None:
+        """
+        Write the gazetteer as an uncompressed Arrow IPC file.
+
+        Args:
+            path (str | Path): Destination file.
+
+        Returns:
+            None
+        """
+        table = pa.Table.from_pandas(self.table, preserve_index=False)
+        table = table.replace_schema_metadata({**table.schema.metadata, b'gazetteer_version': self.version.encode()})
+        with pa.OSFile(str(path), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "Gazetteer":
+        """
+        Load a gazetteer file by memory-mapping it.
+
+        Args:
+            path (str | Path): Gazetteer file written by Gazetteer.save().
+
+        Returns:
+            Gazetteer: The loaded gazetteer.
+        """
+        with pa.memory_map(str(path), 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+        version = table.schema.metadata[b'gazetteer_version'].decode()
+        return cls(table.to_pandas(), version)
+
+    def by_name(self, kinds: list | None = None) -> pd.DataFrame:
+        """
+        Most populated place for each name.
+
+        Args:
+            kinds (list | None): Kinds of names to consider, all if None.
+
+        Returns:
+            pd.DataFrame: Rows indexed by name with columns lat, lon, state and population.
+        """
+        table = self.table if kinds is None else self.table[self.table['kind'].isin(kinds)]
+        # The table is sorted by decreasing population
+        return table.drop_duplicates(subset='name', keep='first').set_index('name')[['lat', 'lon', 'state', 'population']]
+
+    @cached_property
+    def name_index(self) -> TrigramIndex:
+        """
+        Trigram index over all the names, built on first use.
+
+        Names are indexed by decreasing population, so ties go to the most
+        populated place.
+        """
+        return TrigramIndex(self.by_name().index)
+
+    def geocode(self, locations: pd.Series, fuzzy_threshold: float | None = None) -> tuple[pd.DataFrame, pd.Series]:
+        """
+        Geocode a column of "City, State" strings with a tiered join on the gazetteer.
+
+        Each distinct string is split once and resolved by successive merges,
+        each tier only seeing the strings left unresolved by the previous ones:
+
+        1. city_state: official name and state match exactly
+        2. city: official name only, most populated place
+        3. alternate: alternate or historic name only, most populated place
+        4. fuzzy: most similar name of any kind in the trigram index, only if
+           fuzzy_threshold is given
+
+        Args:
+            locations (pd.Series): Column of "City, State" strings.
+            fuzzy_threshold (float | None): Minimum Dice similarity of the fuzzy
+                tier, None to disable it.
+
+        Returns:
+            tuple[pd.DataFrame, pd.Series]: DataFrame indexed like locations with
+                columns lat, lon, tier (categorical of Gazetteer.tiers), match (the
+                gazetteer name used) and score (1.0 for exact tiers, the Dice
+                similarity for the fuzzy tier), and the number of rows resolved by
+                each tier.
+
+        Example:
+            coords, hits = gazetteer.geocode(df["Geo-location Data"])
+        """
+        codes, uniques = pd.factorize(locations)
+        parts = pd.Series(uniques, dtype=object).str.split(', ', n=1, expand=True).reindex(columns=[0, 1])
+        keys = pd.DataFrame({'city': parts[0], 'state': parts[1]})
+
+        primary = self.table[self.table['kind'] == 'primary']
+        lookups = [
+            ('city_state', primary.drop_duplicates(subset=['name', 'state']), ['city', 'state']),
+            ('city', self.by_name(['primary']).reset_index(), ['city']),
+            ('alternate', self.by_name(['alternate', 'historic']).reset_index(), ['city']),
+        ]
+
+        resolved = pd.DataFrame({'lat': np.nan, 'lon': np.nan, 'tier': 'missing', 'match': None, 'score': np.nan},
+                                index=keys.index)
+        for tier, lookup, on in lookups:
+            pending = keys[resolved['tier'] == 'missing']
+            if pending.empty:
+                break
+            lookup = lookup.rename(columns={'name': 'city'})[on + ['lat', 'lon']]
+            hits = pending.reset_index().merge(lookup, on=on, how='inner').set_index('index')
+            resolved.loc[hits.index, ['lat', 'lon']] = hits[['lat', 'lon']]
+            resolved.loc[hits.index, 'match'] = hits['city']
+            resolved.loc[hits.index, ['tier', 'score']] = [tier, 1.0]
+
+        pending = keys[(resolved['tier'] == 'missing') & keys['city'].notna()]
+        if fuzzy_threshold is not None and not pending.empty:
+            # Each distinct unmatched city is looked up once in the trigram index
+            cities = pending['city'].drop_duplicates()
+            matches = self.name_index.match(cities, threshold=fuzzy_threshold).set_index('name').dropna(subset='match')
+            hits = (pending.reset_index()
+                .merge(matches, left_on='city', right_index=True)
+                .merge(self.by_name()[['lat', 'lon']], left_on='match', right_index=True)
+                .set_index('index'))
+            resolved.loc[hits.index, ['lat', 'lon', 'match', 'score']] = hits[['lat', 'lon', 'match', 'score']]
+            resolved.loc[hits.index, 'tier'] = 'fuzzy'
+
+        # factorize marks missing values with -1, which takes the trailing unresolved row
+        resolved.loc[len(resolved)] = [np.nan, np.nan, 'missing', None, np.nan]
+        resolved['tier'] = pd.Categorical(resolved['tier'], categories=self.tiers)
+        coords = resolved.take(codes)
+        coords.index = locations.index
+        return coords, coords['tier'].value_counts(sort=False)
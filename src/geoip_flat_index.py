@@ -0,0 +1,242 @@
+import ipaddress
+import json
+from pathlib import Path
+
+import maxminddb
+import numpy as np
+import pandas as pd
+
+from src.geoip_resolver import GeoIPResolver
+
+
+class GeoIPFlatIndex():
+    """
+    Flat, array-based GeoIP index for resolving millions of IP addresses.
+
+    The networks of a GeoLite2-City database are exported once into sorted
+    start/end arrays (uint32 for IPv4, 16-byte big-endian keys for IPv6)
+    pointing into a compact table of distinct locations. A whole column of
+    addresses is then resolved with a single np.searchsorted per address
+    family instead of one reader call per IP.
+
+    It is a drop-in replacement for GeoIPResolver: lookup() and resolve()
+    return the same fields and columns.
+
+    Attributes:
+        index_dir (Path): Directory holding the exported arrays.
+        build_epoch (int): build_epoch of the database the index was built from.
+        locations (pd.DataFrame): Distinct locations with columns lat, lon, country, city.
+    """
+
+    columns = GeoIPResolver.columns
+
+    def __init__(self, index_dir: str | Path) -> None:
+        """
+        Load an index previously written by GeoIPFlatIndex.build().
+
+        The range arrays are memory-mapped, so loading is near instantaneous.
+
+        Args:
+            index_dir (str | Path): Directory holding the exported arrays.
+
+        Returns:
+            None
+        """
+        self.index_dir = Path(index_dir)
+        with open(self.index_dir / "meta.json") as f:
+            self.build_epoch = json.load(f)["build_epoch"]
+        self.ranges = {
+            family: tuple(np.load(self.index_dir / f"{family}_{part}.npy", mmap_mode="r")
+                          for part in ("start", "end", "loc"))
+            for family in ("v4", "v6")
+        }
+        locations = pd.read_parquet(self.index_dir / "locations.parquet")
+        # The trailing empty row is the target of unresolved addresses (location id -1)
+        self.locations = pd.concat(
+            [locations, pd.DataFrame([(np.nan, np.nan, None, None)], columns=self.columns)],
+            ignore_index=True)
+
+    @classmethod
+    def build(cls, db_path: str, index_dir: str | Path) -> "GeoIPFlatIndex":
+        """
+        Export the networks of a GeoLite2-City database into a flat index.
+
+        Args:
+            db_path (str): Path of the GeoLite2-City .mmdb file.
+            index_dir (str | Path): Directory where the arrays are written.
+
+        Returns:
+            GeoIPFlatIndex: The freshly built index.
+        """
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+
+        location_ids = dict()
+        ranges = {"v4": ([], [], []), "v6": ([], [], [])}
+        with maxminddb.open_database(db_path) as reader:
+            build_epoch = reader.metadata().build_epoch
+            print(f"Building flat GeoIP index from {db_path}...")
+            for network, record in reader:
+                location = record.get("location", {})
+                key = (
+                    location.get("latitude", np.nan),
+                    location.get("longitude", np.nan),
+                    record.get("country", {}).get("names", {}).get("en"),
+                    record.get("city", {}).get("names", {}).get("en"),
+                )
+                loc_id = location_ids.setdefault(key, len(location_ids))
+                if network.version == 4:
+                    starts, ends, locs = ranges["v4"]
+                    starts.append(int(network.network_address))
+                    ends.append(int(network.broadcast_address))
+                else:
+                    starts, ends, locs = ranges["v6"]
+                    starts.append(network.network_address.packed)
+                    ends.append(network.broadcast_address.packed)
+                locs.append(loc_id)
+
+        for family, dtype in (("v4", np.uint32), ("v6", "S16")):
+            starts, ends, locs = ranges[family]
+            starts = np.array(starts, dtype=dtype)
+            order = np.argsort(starts, kind="stable")
+            np.save(index_dir / f"{family}_start.npy", starts[order])
+            np.save(index_dir / f"{family}_end.npy", np.array(ends, dtype=dtype)[order])
+            np.save(index_dir / f"{family}_loc.npy", np.array(locs, dtype=np.int32)[order])
+
+        locations = pd.DataFrame.from_records(list(location_ids), columns=cls.columns)
+        locations.astype({"lat": "float64", "lon": "float64"}).to_parquet(index_dir / "locations.parquet")
+        with open(index_dir / "meta.json", "w") as f:
+            json.dump({"db_path": str(db_path), "build_epoch": build_epoch}, f)
+
+        print(f"Flat GeoIP index: {len(ranges['v4'][0])} IPv4 and {len(ranges['v6'][0])} IPv6 networks, "
+              f"{len(location_ids)} distinct locations")
+        return cls(index_dir)
+
+    @classmethod
+    def load_or_build(cls, db_path: str, index_dir: str | Path) -> "GeoIPFlatIndex":
+        """
+        Load the flat index, rebuilding it if missing or built from another database build.
+
+        Args:
+            db_path (str): Path of the GeoLite2-City .mmdb file.
+            index_dir (str | Path): Directory holding the exported arrays.
+
+        Returns:
+            GeoIPFlatIndex: An index in sync with the database.
+        """
+        meta_path = Path(index_dir) / "meta.json"
+        if meta_path.exists():
+            with open(meta_path) as f:
+                index_epoch = json.load(f)["build_epoch"]
+            with maxminddb.open_database(db_path) as reader:
+                if reader.metadata().build_epoch == index_epoch:
+                    return cls(index_dir)
+        return cls.build(db_path, index_dir)
+
+    def lookup(self, ip_address: str) -> tuple:
+        """
+        Look up a single IP address.
+
+        Args:
+            ip_address (str): a string representing an IP address
+
+        Returns:
+            tuple: (latitude, longitude, country, city), same as GeoIPResolver.lookup().
+        """
+        return tuple(self.resolve(pd.Series([ip_address])).iloc[0])
+
+    def resolve(self, ip_addresses: pd.Series) -> pd.DataFrame:
+        """
+        Resolve a whole column of IP addresses with vectorized range searches.
+
+        Args:
+            ip_addresses (pd.Series): Series of IP address strings. Missing or
+                invalid values resolve to missing fields.
+
+        Returns:
+            pd.DataFrame: DataFrame indexed like ip_addresses with columns
+                lat, lon (float64), country and city (object).
+        """
+        codes, uniques = pd.factorize(ip_addresses)
+        uniques = pd.Series(uniques, dtype=object).astype(str)
+        loc_ids = np.full(len(uniques), -1, dtype=np.int64)
+
+        is_v4 = ~uniques.str.contains(":", regex=False)
+        v4_keys, v4_valid = self._ipv4_to_uint32(uniques[is_v4])
+        loc_ids[np.flatnonzero(is_v4)[v4_valid]] = self._search("v4", v4_keys[v4_valid])
+
+        v6_positions = np.flatnonzero(~is_v4)
+        v6_keys, v6_valid = self._ipv6_to_bytes(uniques.iloc[v6_positions])
+        loc_ids[v6_positions[v6_valid]] = self._search("v6", v6_keys[v6_valid])
+
+        # factorize marks missing values with -1, which also takes the trailing empty row
+        row_loc_ids = np.where(codes >= 0, loc_ids[codes], -1)
+        resolved = self.locations.take(row_loc_ids)
+        resolved.index = ip_addresses.index
+        return resolved
+
+    def _search(self, family: str, keys: np.ndarray) -> np.ndarray:
+        """
+        Find the location id of each key in the sorted ranges of one address family.
+
+        Args:
+            family (str): "v4" or "v6".
+            keys (np.ndarray): Address keys with the dtype of the family's ranges.
+
+        Returns:
+            np.ndarray: Location id of each key, -1 where no network contains it.
+        """
+        starts, ends, locs = self.ranges[family]
+        if len(starts) == 0 or len(keys) == 0:
+            return np.full(len(keys), -1, dtype=np.int64)
+        positions = np.searchsorted(starts, keys, side="right") - 1
+        clipped = np.clip(positions, 0, None)
+        found = (positions >= 0) & (keys <= ends[clipped])
+        return np.where(found, locs[clipped], -1)
+
+    @staticmethod
+    def _ipv4_to_uint32(ip_addresses: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Convert dotted-quad strings to uint32 keys without a Python loop.
+
+        Args:
+            ip_addresses (pd.Series): IPv4 address strings.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The uint32 keys and a mask of the
+                strings that are valid IPv4 addresses.
+        """
+        # Strict dotted-quad syntax, as ipaddress (and so the geoip2 reader) accepts it: ASCII
+        # digits only, no sign, exponent, whitespace or leading zero
+        valid = ip_addresses.str.fullmatch(r"(0|[1-9][0-9]{0,2})(\.(0|[1-9][0-9]{0,2})){3}").eq(True)
+        octets = ip_addresses.where(valid).str.split(".", expand=True).reindex(columns=range(4))
+        octets = octets.apply(pd.to_numeric, errors="coerce")
+        valid = (valid & octets.le(255).all(axis=1)).to_numpy()
+        octets = octets.fillna(0).to_numpy(dtype=np.uint32)
+        keys = (octets[:, 0] << 24) | (octets[:, 1] << 16) | (octets[:, 2] << 8) | octets[:, 3]
+        return keys.astype(np.uint32), valid
+
+    @staticmethod
+    def _ipv6_to_bytes(ip_addresses: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Convert IPv6 strings to 16-byte big-endian keys.
+
+        IPv6 addresses are rare in the logs, so they are parsed one by one.
+
+        Args:
+            ip_addresses (pd.Series): IPv6 address strings.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The S16 keys and a mask of the
+                strings that are valid IPv6 addresses.
+        """
+        keys = []
+        valid = []
+        for ip in ip_addresses:
+            try:
+                keys.append(ipaddress.IPv6Address(ip).packed)
+                valid.append(True)
+            except ValueError:
+                keys.append(bytes(16))
+                valid.append(False)
+        return np.array(keys, dtype="S16"), np.array(valid, dtype=bool)
@@ -0,0 +1,217 @@
+from functools import lru_cache
+from pathlib import Path
+
+import geoip2.database
+import geoip2.errors
+import numpy as np
+import pandas as pd
+from maxminddb import MODE_MMAP
+
+
+class GeoIPResolver():
+    """
+    Long-lived GeoIP resolver backed by a single memory-mapped GeoLite2 reader.
+
+    The .mmdb file is opened once and shared by every lookup. Single lookups
+    are memoized with an LRU cache keyed by IP address (attack logs repeat
+    the same addresses heavily), and whole columns are resolved in bulk by
+    looking up only their distinct values.
+
+    Attributes:
+        db_path (str): Path of the GeoLite2-City .mmdb file.
+        reader (geoip2.database.Reader): The shared memory-mapped reader.
+        columns (list): Names of the columns returned by resolve().
+    """
+
+    columns = ["lat", "lon", "country", "city"]
+
+    def __init__(self, db_path: str, cache_size: int = 65_536, cache_path: str | Path | None = None) -> None:
+        """
+        Open the GeoLite2 database and set up the lookup caches.
+
+        Args:
+            db_path (str): Path of the GeoLite2-City .mmdb file.
+            cache_size (int): Maximum number of IP addresses kept in the LRU cache.
+            cache_path (str | Path | None): Optional parquet file used as a persistent
+                IP -> geo cache across runs. See GeoIPCache.
+
+        Returns:
+            None
+        """
+        self.db_path = db_path
+        self.reader = geoip2.database.Reader(db_path, mode=MODE_MMAP)
+        self.build_epoch = self.reader.metadata().build_epoch
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+        self.disk_cache = GeoIPCache(cache_path) if cache_path is not None else None
+
+    def _lookup(self, ip_address: str) -> tuple:
+        """
+        Look up a single IP address in the database, bypassing the cache.
+
+        Args:
+            ip_address (str): a string representing an IP address
+
+        Returns:
+            tuple: (latitude, longitude, country, city). Fields that can not
+                be resolved are NaN for coordinates and None for names.
+        """
+        try:
+            response = self.reader.city(ip_address)
+        except (geoip2.errors.AddressNotFoundError, ValueError, TypeError):
+            return (np.nan, np.nan, None, None)
+        lat = response.location.latitude
+        lon = response.location.longitude
+        return (
+            np.nan if lat is None else lat,
+            np.nan if lon is None else lon,
+            response.country.name,
+            response.city.name,
+        )
+
+    def resolve(self, ip_addresses: pd.Series) -> pd.DataFrame:
+        """
+        Resolve a whole column of IP addresses in one pass.
+
+        Each distinct address is looked up once (through the LRU cache) and
+        the results are broadcast back to every row with a positional take.
+
+        Args:
+            ip_addresses (pd.Series): Series of IP address strings. Missing
+                values are allowed and resolve to missing fields.
+
+        Returns:
+            pd.DataFrame: DataFrame indexed like ip_addresses with columns
+                lat, lon (float64), country and city (object).
+
+        Example:
+            resolver = GeoIPResolver(GEOIP_DB_PATH)
+            df[["lat", "lon", "country", "city"]] = resolver.resolve(df["Source IP Address"])
+        """
+        codes, uniques = pd.factorize(ip_addresses)
+        table = self._resolve_unique(uniques)
+        # factorize marks missing values with -1, which takes the trailing empty row
+        table = pd.concat([table, pd.DataFrame([(np.nan, np.nan, None, None)], columns=self.columns)],
+                          ignore_index=True)
+        resolved = table.take(codes)
+        resolved.index = ip_addresses.index
+        return resolved
+
+    def _resolve_unique(self, ip_addresses) -> pd.DataFrame:
+        """
+        Resolve an array of distinct IP addresses.
+
+        When a persistent cache is configured, only the addresses never seen
+        with the current database build are looked up, and they are then
+        added to the cache.
+
+        Args:
+            ip_addresses (array-like): Distinct IP address strings.
+
+        Returns:
+            pd.DataFrame: One row per address with columns lat, lon, country, city.
+        """
+        if self.disk_cache is None:
+            return self._lookup_many(ip_addresses)
+
+        cached = self.disk_cache.load(self.build_epoch)
+        ip_addresses = pd.Index(ip_addresses, dtype=object)
+        missing = ip_addresses[~ip_addresses.isin(cached.index)]
+        if len(missing) > 0:
+            fresh = self._lookup_many(missing).set_axis(missing)
+            self.disk_cache.store(fresh, self.build_epoch)
+            cached = fresh if cached.empty else pd.concat([cached, fresh])
+        print(f"GeoIP cache: {len(ip_addresses) - len(missing)} hits, {len(missing)} new lookups")
+        return cached.reindex(ip_addresses).reset_index(drop=True)
+
+    def _lookup_many(self, ip_addresses) -> pd.DataFrame:
+        """
+        Look up every address of an array through the LRU cache.
+
+        Args:
+            ip_addresses (array-like): IP address strings.
+
+        Returns:
+            pd.DataFrame: One row per address with columns lat, lon, country, city.
+        """
+        records = [self.lookup(ip) for ip in ip_addresses]
+        table = pd.DataFrame.from_records(records, columns=self.columns)
+        return table.astype({"lat": "float64", "lon": "float64", "country": object, "city": object})
+
+    def close(self) -> None:
+        """
+        Close the underlying reader and drop the lookup cache.
+        """
+        self.lookup.cache_clear()
+        self.reader.close()
+
+    def __enter__(self) -> "GeoIPResolver":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class GeoIPCache():
+    """
+    Incremental on-disk IP -> geolocation cache.
+
+    The cache is a parquet table keyed by IP address and by the build_epoch
+    of the GeoLite2 database that produced each row. Lookups only ever use
+    the rows of the current build, so a refreshed database invalidates
+    exactly the rows resolved with an older build: they are dropped the
+    next time the cache is written, while rows of the current build are kept.
+
+    Attributes:
+        cache_path (Path): Location of the parquet file.
+    """
+
+    def __init__(self, cache_path: str | Path) -> None:
+        """
+        Args:
+            cache_path (str | Path): Location of the parquet file. Its parent
+                directory is created if needed.
+
+        Returns:
+            None
+        """
+        self.cache_path = Path(cache_path)
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def load(self, build_epoch: int) -> pd.DataFrame:
+        """
+        Load the cached rows produced by the given database build.
+
+        Args:
+            build_epoch (int): build_epoch of the GeoLite2 database in use.
+
+        Returns:
+            pd.DataFrame: Rows indexed by IP address with columns lat, lon,
+                country, city. Empty if the cache does not exist yet.
+        """
+        if not self.cache_path.exists():
+            return pd.DataFrame(columns=GeoIPResolver.columns, index=pd.Index([], dtype=object, name="ip"))
+        cached = pd.read_parquet(self.cache_path, filters=[("build_epoch", "==", build_epoch)])
+        return cached.set_index("ip")[GeoIPResolver.columns]
+
+    def store(self, table: pd.DataFrame, build_epoch: int) -> None:
+        """
+        Add freshly resolved rows to the cache and drop rows of older builds.
+
+        Args:
+            table (pd.DataFrame): Rows indexed by IP address with columns lat,
+                lon, country, city.
+            build_epoch (int): build_epoch of the database that resolved them.
+
+        Returns:
+            None
+        """
+        new_rows = table.rename_axis("ip").reset_index()
+        new_rows.insert(1, "build_epoch", build_epoch)
+        if self.cache_path.exists():
+            cached = pd.read_parquet(self.cache_path)
+            stale = cached["build_epoch"] != build_epoch
+            if stale.any():
+                print(f"GeoIP cache: dropping {stale.sum()} rows from older database builds")
+            cached = cached[~stale & ~cached["ip"].isin(new_rows["ip"])]
+            new_rows = pd.concat([cached, new_rows], ignore_index=True)
+        new_rows.to_parquet(self.cache_path, index=False)
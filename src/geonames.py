@@ -0,0 +1,81 @@
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+# Columns of the GeoNames alternateNamesV2.txt dump (tab separated, no header)
+ALTERNATE_NAMES_COLUMNS = [
+    'alternate_name_id', 'geonameid', 'isolanguage', 'alt_name', 'is_preferred',
+    'is_short', 'is_colloquial', 'is_historic', 'from', 'to'
+]
+
+
+def load_alternate_names(path: str | Path, geonameids, cache_path: str | Path | None = None,
+                         block_size: int = 64 << 20) -> pd.DataFrame:
+    """
+    Load the alternate names of a set of GeoNames ids from alternateNamesV2.txt.
+
+    The worldwide file is streamed in blocks with the pyarrow CSV reader and
+    each block is filtered on geonameid before the next one is read, so only
+    the matching rows are ever held in memory. The filtered subset is cached
+    as parquet and reused as long as the source file and the id set are the
+    same.
+
+    Args:
+        path (str | Path): Path of alternateNamesV2.txt.
+        geonameids (iterable): GeoNames ids to keep.
+        cache_path (str | Path | None): Parquet file caching the filtered subset.
+        block_size (int): Number of bytes parsed per streamed block.
+
+    Returns:
+        pd.DataFrame: DataFrame with columns geonameid (int64), alt_name (str)
+            and is_historic (int8, 1 for historic names, 0 otherwise).
+
+    Example:
+        alt_names = load_alternate_names('data/alternateNamesV2.txt', india_df['geonameid'],
+                                         cache_path='data/alternateNamesV2_IN.parquet')
+    """
+    path = Path(path)
+    ids = np.unique(np.asarray(list(geonameids), dtype=np.int64))
+    stat = path.stat()
+    fingerprint = {
+        b'source_mtime': str(stat.st_mtime_ns).encode(),
+        b'source_size': str(stat.st_size).encode(),
+        b'ids_digest': hashlib.blake2b(ids.tobytes(), digest_size=16).hexdigest().encode(),
+    }
+
+    if cache_path is not None and Path(cache_path).exists():
+        metadata = pq.read_schema(cache_path).metadata or dict()
+        if all(metadata.get(k) == v for k, v in fingerprint.items()):
+            print(f"Loading cached alternate names from {cache_path}")
+            return pd.read_parquet(cache_path)
+
+    print(f"Streaming {path.name} filtered on {len(ids)} geonameids...")
+    reader = pv.open_csv(
+        path,
+        read_options=pv.ReadOptions(column_names=ALTERNATE_NAMES_COLUMNS, block_size=block_size),
+        parse_options=pv.ParseOptions(delimiter='\t', quote_char=False,
+                                      invalid_row_handler=lambda row: 'skip'),
+        convert_options=pv.ConvertOptions(
+            include_columns=['geonameid', 'alt_name', 'is_historic'],
+            column_types={'geonameid': pa.int64(), 'alt_name': pa.string(), 'is_historic': pa.string()},
+        ),
+    )
+    value_set = pa.array(ids)
+    batches = [batch.filter(pc.is_in(batch.column('geonameid'), value_set=value_set)) for batch in reader]
+    table = pa.Table.from_batches(batches, schema=reader.schema)
+
+    alt_names = table.to_pandas()
+    alt_names['is_historic'] = (alt_names['is_historic'] == '1').astype('int8')
+
+    if cache_path is not None:
+        table = pa.Table.from_pandas(alt_names, preserve_index=False)
+        pq.write_table(table.replace_schema_metadata({**(table.schema.metadata or dict()), **fingerprint}),
+                       cache_path)
+    print(f"Alternate names kept: {len(alt_names)}")
+    return alt_names
@@ -0,0 +1,80 @@
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Explicit dtypes of the cybersecurity_attacks.csv columns, the others are read as strings
+ATTACKS_DTYPES = {
+    'Source Port': 'uint16',
+    'Destination Port': 'uint16',
+    'Packet Length': 'uint16',
+    'Anomaly Scores': 'float64',
+    'Protocol': 'category',
+    'Packet Type': 'category',
+    'Traffic Type': 'category',
+    'Action Taken': 'category',
+    'Severity Level': 'category',
+    'Network Segment': 'category',
+    'Log Source': 'category',
+}
+ATTACKS_DATES = ['Timestamp']
+
+
+def read_attacks(csv_path: str | Path, sep: str = ',', index_col: int | None = None,
+                 mirror_path: str | Path | None = None) -> pd.DataFrame:
+    """
+    Read the cybersecurity attacks dataset with an explicit schema and a parquet mirror.
+
+    The CSV is parsed with the pyarrow engine using ATTACKS_DTYPES and
+    ATTACKS_DATES (only the columns present in the file are typed). The typed
+    frame is then saved as a parquet mirror next to the CSV, and later calls
+    load the mirror instead as long as the CSV keeps the same modification
+    time and size.
+
+    Args:
+        csv_path (str | Path): Path of the CSV file.
+        sep (str): Field delimiter of the CSV file.
+        index_col (int | None): Column to use as the index, as in pd.read_csv.
+        mirror_path (str | Path | None): Path of the parquet mirror, the CSV
+            path with a .parquet suffix if None.
+
+    Returns:
+        pd.DataFrame: The typed dataset.
+
+    Example:
+        df = read_attacks("data/cybersecurity_attacks.csv")
+        df = read_attacks("data/df.csv", sep="|", index_col=0)
+    """
+    csv_path = Path(csv_path)
+    mirror_path = csv_path.with_suffix('.parquet') if mirror_path is None else Path(mirror_path)
+    stat = csv_path.stat()
+    fingerprint = {
+        b'source_mtime': str(stat.st_mtime_ns).encode(),
+        b'source_size': str(stat.st_size).encode(),
+    }
+
+    if mirror_path.exists():
+        metadata = pq.read_schema(mirror_path).metadata or dict()
+        if all(metadata.get(k) == v for k, v in fingerprint.items()):
+            print(f"Loading {csv_path.name} from its parquet mirror {mirror_path}")
+            return pd.read_parquet(mirror_path)
+
+    print(f"Parsing {csv_path.name}...")
+    header = pd.read_csv(csv_path, sep=sep, nrows=0).columns
+    df = pd.read_csv(
+        csv_path,
+        sep=sep,
+        index_col=index_col,
+        engine='pyarrow',
+        dtype={col: dtype for col, dtype in ATTACKS_DTYPES.items() if col in header},
+        parse_dates=[col for col in ATTACKS_DATES if col in header],
+    )
+    # pyarrow infers second resolution, use the pandas default so cold and warm loads agree
+    for col in ATTACKS_DATES:
+        if col in header:
+            df[col] = df[col].astype('datetime64[ns]')
+
+    table = pa.Table.from_pandas(df, preserve_index=index_col is not None)
+    pq.write_table(table.replace_schema_metadata({**(table.schema.metadata or dict()), **fingerprint}), mirror_path)
+    return df
@@ -1,71 +1,310 @@
 import pandas as pd
 import numpy as np
 import re
-from collections import Counter
-from scipy.stats import entropy
+import string
 import base64
 import binascii
+import hashlib
+import urllib.parse
+from functools import lru_cache
 from lingua import Language, LanguageDetectorBuilder
-import os
+import pyarrow as pa
+import pyarrow.compute as pc
 
-# Import the Google Cloud Translation library.
-from google.cloud import translate_v3
+from src.signature_scanner import SignatureScanner
+from src.translation import IdentityBackend, Translator
 
-PROJECT_ID = os.environ.get("GOOGLE_CLOUD_PROJECT")
+
+# Words of the Lorem Ipsum placeholder text, a payload with several of them is generated text
+LOREM_MARKERS = [
+    'lorem', 'ipsum', 'dolor', 'sit amet', 'consectetur', 
+    'adipiscing', 'elit', 'sed do', 'eiusmod', 'tempor',
+    'incididunt', 'labore', 'dolore', 'magna', 'aliqua'
+]
+# Minimum number of distinct markers of a Lorem Ipsum payload
+LOREM_MIN_MARKERS = 3
+
+# Separator of the joined payloads (ASCII unit separator), none of the obfuscation patterns match it
+OBFUSCATION_SEPARATOR = '\x1f'
+# Candidate encoded segments, only these spans are decoded. The escape patterns start
+# with a literal so re can skip ahead to it.
+OBFUSCATION_PATTERNS = {
+    'base64': re.compile(r'(?<![A-Za-z0-9+/])(?:[A-Za-z0-9+/]{4}){4,}(?:[A-Za-z0-9+/]{2}==|[A-Za-z0-9+/]{3}=)?(?![A-Za-z0-9+/=])'),
+    'hex': re.compile(r'\\x[0-9a-fA-F]{2}(?:\\x[0-9a-fA-F]{2}){3,}|(?<![0-9a-zA-Z])(?:0x)?(?:[0-9a-fA-F]{2}){8,}(?![0-9a-zA-Z])'),
+    'percent': re.compile(r'%[0-9a-fA-F]{2}(?:[^\s%\x1f]*?%[0-9a-fA-F]{2}){2,}'),
+    'unicode': re.compile(r'\\u[0-9a-fA-F]{4}(?:\\u[0-9a-fA-F]{4})+'),
+}
+# Pattern every payload with a candidate segment matches (hex digits are base64 characters),
+# run by Arrow's linear time RE2 engine to pick the payloads worth scanning
+OBFUSCATION_PREFILTER = r'[A-Za-z0-9+/]{16}|\\x[0-9a-fA-F]{2}|%[0-9a-fA-F]{2}|\\u[0-9a-fA-F]{4}'
+
+
+def readable(data: bytes) -> str | None:
+    """Decode bytes as UTF-8 text, None if they are not mostly printable text"""
+    try:
+        text = data.decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+    printable = sum(c.isprintable() or c.isspace() for c in text)
+    return text if text and printable >= 0.9 * len(text) else None
+
+
+def decode_segment(kind: str, segment: str) -> str | None:
+    """Decode a candidate segment of an OBFUSCATION_PATTERNS kind, None if it does not decode to text"""
+    try:
+        if kind == 'base64':
+            return readable(base64.b64decode(segment, validate=True))
+        if kind == 'hex':
+            return readable(binascii.unhexlify(segment.replace('\\x', '').removeprefix('0x')))
+        if kind == 'percent':
+            return readable(urllib.parse.unquote_to_bytes(segment))
+        return readable(segment.encode('ascii').decode('unicode_escape').encode('utf-8'))
+    except (binascii.Error, ValueError):
+        return None
+
+
+@lru_cache(maxsize=None)
+def language_detector():
+    """Build the lingua detector once per process, building it is by far the slowest part of detection"""
+    # With LATIN as its only language, lingua 2 answers None for every text (it has no other
+    # language to rank it against), so every payload would be "not_latin". ENGLISH is the
+    # alternative: a payload is "latin" when it reads more like Latin than like English.
+    return LanguageDetectorBuilder.from_languages(Language.LATIN, Language.ENGLISH).build()
 
 
 
 class PayloadAnalyzer:
-    def __init__(self, df, payload_col='payload'):
+    def __init__(self, df, payload_col='payload', translator=None):
         self.df = df
         self.payload_col = payload_col
+        # payload hash -> detected language label
+        self.language_cache = {}
+        # payload hash -> obfuscation features
+        self.obfuscation_cache = {}
+        # offline by default: the no-op local backend, without persistent cache
+        self.translator = Translator(IdentityBackend()) if translator is None else translator
     
+    @staticmethod
+    def payload_hash(payload_text) -> bytes:
+        """Digest identifying a payload in the caches"""
+        return hashlib.blake2b(payload_text.encode(), digest_size=16).digest()
+    
+    def deduplicate(self, payloads: pd.Series) -> tuple[np.ndarray, pd.Series]:
+        """
+        Distinct payloads of a column, to analyse each payload once, see broadcast.
+
+        Payloads are grouped by content with pd.factorize (a single pass of its
+        native hash table), and a stats line reports the dedup ratio. Missing
+        payloads are grouped as one trailing None payload, which every analysis
+        handles like a single missing payload.
+
+        Returns:
+            tuple[np.ndarray, pd.Series]: For each row, the position of its
+                payload among the distinct ones, and the distinct payloads
+                indexed by position.
+        """
+        codes, uniques = pd.factorize(payloads)
+        missing = codes < 0
+        distinct = list(uniques) + ([None] if missing.any() else [])
+        codes[missing] = len(distinct) - 1
+        ratio = len(payloads) / len(distinct) if distinct else 1.0
+        print(f"Payload dedup: {len(payloads)} rows, {len(uniques)} distinct payloads, "
+              f"{missing.sum()} missing, dedup ratio {ratio:.2f}x")
+        return codes, pd.Series(distinct, dtype=object)
+    
+    @staticmethod
+    def broadcast(results: pd.DataFrame, codes: np.ndarray, index: pd.Index) -> pd.DataFrame:
+        """Spread the results of the distinct payloads, see deduplicate, back to the rows"""
+        return results.iloc[codes].set_axis(index)
     
     def detect_payload_language(self, payload_text) -> str:
-        languages = Language.LATIN
-        detector = LanguageDetectorBuilder.from_languages(languages).build()
-        language = detector.detect_language_of(payload_text)
-        if language != Language.LATIN:
-            return "not_latin"
-        else:
-            return "latin"
+        """Detect if a payload is Latin, see detect_payload_languages"""
+        return self.detect_payload_languages(pd.Series([payload_text])).iloc[0]
+    
+    def detect_payload_languages(self, payloads: pd.Series) -> pd.Series:
+        """
+        Detect if each payload is Latin ("latin") or not ("not_latin"), "unknown" if missing.
+
+        Distinct payloads not already in the cache are classified in a single
+        batched lingua call, spread over all cores by lingua itself.
+        """
+        codes, uniques = pd.factorize(payloads)
+        keys = [self.payload_hash(text) for text in uniques]
+        pending = [i for i, key in enumerate(keys) if key not in self.language_cache]
+        if pending:
+            languages = language_detector().detect_languages_in_parallel_of([uniques[i] for i in pending])
+            for i, language in zip(pending, languages):
+                self.language_cache[keys[i]] = "latin" if language == Language.LATIN else "not_latin"
+        # factorize marks missing payloads with -1, which takes the trailing "unknown"
+        labels = np.array([self.language_cache[key] for key in keys] + ["unknown"], dtype=object)
+        return pd.Series(labels[codes], index=payloads.index)
+    
+    def payload_translate(self, payload_text) -> str | None:
+        """Translate a payload to English, see translate_payloads"""
+        return self.translate_payloads(pd.Series([payload_text])).iloc[0]
     
-    def payload_translate(self, payload_text) -> dict | str:
-        """Detect language and translate to English"""
-        
-        # 1. Detect language
-        try:
-            lang = self.detect_payload_language(payload_text)
-            print(f"Detected: {lang}")
-        except:
-            lang = 'unknown'
-        
-        # 2. Translate to English if not already English
-        if lang != 'en':
-            try:
-                translated = GoogleTranslator(source='auto', target='en').translate(payload_text)
-                return translated
-            except Exception as e:
-                return {'error': str(e)}
+    def translate_payloads(self, payloads: pd.Series, skip: pd.Series | None = None) -> pd.Series:
+        """
+        Translate the payloads to English in batches with the analyzer translator.
+
+        Payloads masked by skip (e.g. the ones classified as Lorem Ipsum) are
+        not sent to the backend and get None.
+        """
+        return self.translator.translate(payloads, skip=skip)
             
     def is_lorem_ipsum(self, payload_text) -> bool:
-        """Detect if text is Lorem Ipsum or similar generated text"""
-        lorem_markers = [
-            'lorem', 'ipsum', 'dolor', 'sit amet', 'consectetur', 
-            'adipiscing', 'elit', 'sed do', 'eiusmod', 'tempor',
-            'incididunt', 'labore', 'dolore', 'magna', 'aliqua'
-        ]
-        text_lower = payload_text.lower()
-        matches = sum(1 for marker in lorem_markers if marker in text_lower)
-        return matches >= 3 
+        """Detect if text is Lorem Ipsum or similar generated text, see detect_lorem_ipsum"""
+        return bool(self.detect_lorem_ipsum(pd.Series([payload_text])).iloc[0])
+    
+    def detect_lorem_ipsum(self, payloads: pd.Series, min_markers: int = LOREM_MIN_MARKERS) -> pd.Series:
+        """Detect, for a whole column, the payloads containing at least min_markers Lorem Ipsum markers"""
+        return self.lorem_marker_counts(payloads) >= min_markers
+    
+    def lorem_marker_counts(self, payloads: pd.Series) -> pd.Series:
+        """
+        Count the distinct Lorem Ipsum markers each payload contains, case insensitive.
+
+        Each marker is searched over the whole column at once by the Arrow
+        match_substring kernel, so the cost is one native scan per marker and
+        no Python call per payload. Missing payloads count no marker.
+        """
+        texts = pa.array(payloads, type=pa.large_string(), from_pandas=True)
+        counts = np.zeros(len(texts), dtype=np.int64)
+        for marker in LOREM_MARKERS:
+            found = pc.fill_null(pc.match_substring(texts, marker, ignore_case=True), False)
+            counts += found.to_numpy(zero_copy_only=False)
+        return pd.Series(counts, index=payloads.index)
+    
+    def extract_features(self, payload_text) -> dict:
+        """Extract the features of a single payload, see payload_features"""
+        return self.payload_features(pd.Series([payload_text])).to_dict('records')[0]
+    
+    def payload_features(self, payloads: pd.Series, chunk_rows: int = 65536) -> pd.DataFrame:
+        """
+        Compute the byte level features of a whole payload column.
+
+        The UTF-8 payloads are read as one contiguous uint8 buffer with the
+        offsets of each payload (the Arrow string layout). The 256-bin byte
+        histogram of every payload is a bincount over segment id * 256 + byte,
+        computed for chunk_rows payloads at a time to bound the histogram memory,
+        and all the features derive from the histograms and the buffer with
+        array operations. High entropy is a hint of obfuscated or encrypted payloads.
+
+        Args:
+            payloads (pd.Series): Payloads, missing ones count as empty.
+            chunk_rows (int): Number of payloads whose histograms are held at once.
+
+        Returns:
+            pd.DataFrame: Indexed like payloads, with columns length (int64, bytes),
+                entropy (float64, bits per byte), printable_ratio, digit_ratio,
+                upper_ratio, punct_ratio (float64, shares of the bytes that are
+                printable ASCII, digits, upper case letters and punctuation) and
+                longest_run (int64, longest run of a repeated byte).
+                Empty payloads have all features at 0.
+        """
+        texts = pc.fill_null(pa.array(payloads, type=pa.large_string(), from_pandas=True), '')
+        _, offsets, data = texts.buffers()
+        offsets = np.frombuffer(offsets, dtype=np.int64)[texts.offset:texts.offset + len(texts) + 1]
+        data = np.frombuffer(data, dtype=np.uint8) if data is not None else np.zeros(0, dtype=np.uint8)
+        lengths = np.diff(offsets)
+
+        # Byte classes, as 256-entry masks to apply to the histograms
+        codes = np.arange(256)
+        classes = np.stack([
+            (codes >= 0x20) & (codes < 0x7f) | np.isin(codes, [0x09, 0x0a, 0x0d]),
+            (codes >= ord('0')) & (codes <= ord('9')),
+            (codes >= ord('A')) & (codes <= ord('Z')),
+            np.isin(codes, list(map(ord, string.punctuation))),
+        ], axis=1).astype(np.float64)
+
+        entropies = np.zeros(len(texts))
+        ratios = np.zeros((len(texts), classes.shape[1]))
+        longest = np.zeros(len(texts), dtype=np.int64)
+        for first in range(0, len(texts), chunk_rows):
+            last = min(first + chunk_rows, len(texts))
+            start, end = offsets[first], offsets[last]
+            chunk, sizes = data[start:end], lengths[first:last]
+            segments = np.repeat(np.arange(last - first), sizes)
+            histograms = np.bincount(segments * 256 + chunk, minlength=(last - first) * 256).reshape(-1, 256)
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                p = histograms / sizes[:, None]
+                entropies[first:last] = 0.0 - np.where(histograms > 0, p * np.log2(p), 0).sum(axis=1)
+                ratios[first:last] = np.nan_to_num((histograms @ classes) / sizes[:, None])
+
+            # A run starts at the first byte of a payload and wherever the byte changes
+            nonempty = sizes > 0
+            payload_starts = offsets[first:last][nonempty] - start
+            is_run_start = np.ones(len(chunk), dtype=bool)
+            is_run_start[1:] = chunk[1:] != chunk[:-1]
+            is_run_start[payload_starts] = True
+            run_starts = np.flatnonzero(is_run_start)
+            run_lengths = np.diff(np.r_[run_starts, len(chunk)])
+            if len(run_starts):
+                longest[first:last][nonempty] = np.maximum.reduceat(run_lengths, np.searchsorted(run_starts, payload_starts))
+
+        return pd.DataFrame({
+            'length': lengths,
+            'entropy': entropies,
+            'printable_ratio': ratios[:, 0],
+            'digit_ratio': ratios[:, 1],
+            'upper_ratio': ratios[:, 2],
+            'punct_ratio': ratios[:, 3],
+            'longest_run': longest,
+        }, index=payloads.index)
+    
+    def detect_obfuscation(self, payloads: pd.Series) -> pd.DataFrame:
+        """
+        Find the base64, hex, percent-encoded and unicode-escaped segments of the payloads.
+
+        The distinct payloads missing from the cache are first filtered in bulk
+        with OBFUSCATION_PREFILTER, the remaining ones are joined into a single
+        string and each precompiled pattern scans it once, the payload of a
+        match is found by binary search on the payload start offsets. Only the
+        matched spans are decoded, and a span counts as an encoded segment when
+        it decodes to printable text. Results are cached by payload hash.
+
+        Args:
+            payloads (pd.Series): Payloads, missing ones have no segment.
+
+        Returns:
+            pd.DataFrame: Indexed like payloads, with the number of decoded
+                segments of each kind (base64, hex, percent, unicode, int64),
+                obfuscated (bool, at least one decoded segment) and decoded
+                (the decoded segments joined by ' | ', None if there is none).
+        """
+        kinds = list(OBFUSCATION_PATTERNS)
+        codes, uniques = pd.factorize(payloads)
+        keys = [self.payload_hash(text) for text in uniques]
+        pending = [i for i, key in enumerate(keys) if key not in self.obfuscation_cache]
+        if pending:
+            texts = pa.array([uniques[i] for i in pending], type=pa.large_string())
+            candidates = pc.match_substring_regex(texts, OBFUSCATION_PREFILTER).to_numpy(zero_copy_only=False)
+            texts = [text.replace(OBFUSCATION_SEPARATOR, ' ') for text in texts.filter(candidates).to_pylist()]
+            starts = np.cumsum([0] + [len(text) + 1 for text in texts[:-1]])
+            joined = OBFUSCATION_SEPARATOR.join(texts)
+            counts = np.zeros((len(texts), len(kinds)), dtype=np.int64)
+            decoded = [[] for _ in texts]
+            for k, kind in enumerate(kinds):
+                spans = [(m.start(), m.group(0)) for m in OBFUSCATION_PATTERNS[kind].finditer(joined)]
+                rows = np.searchsorted(starts, [start for start, _ in spans], side='right') - 1
+                for row, (_, segment) in zip(rows, spans):
+                    text = decode_segment(kind, segment)
+                    if text is not None:
+                        counts[row, k] += 1
+                        decoded[row].append(text)
+            for i in pending:
+                self.obfuscation_cache[keys[i]] = (0,) * len(kinds) + (None,)
+            for i, row_counts, row_decoded in zip(np.array(pending)[candidates], counts, decoded):
+                self.obfuscation_cache[keys[i]] = (*row_counts, ' | '.join(row_decoded) or None)
+
+        # factorize marks missing payloads with -1, which takes the trailing empty result
+        results = pd.DataFrame([self.obfuscation_cache[key] for key in keys] + [(0,) * len(kinds) + (None,)],
+                               columns=kinds + ['decoded'])
+        results = results.astype({kind: np.int64 for kind in kinds}).iloc[codes].set_axis(payloads.index)
+        results.insert(len(kinds), 'obfuscated', results[kinds].sum(axis=1) > 0)
+        return results
     
-    def extract_features(self, payload_text):
-        """Extract feature from payload"""
-        features = {}
-        
-        # If entropy is high -> likely obfuscation
-        if len(payload_text) > 0:
-            freq = Counter(payload_text)
-            features['entropy'] = entropy(list(freq.values()), base=2)
-        else:
-            features['entropy'] = 0
\ No newline at end of file
+    def scan_signatures(self, payloads: pd.Series, scanner: SignatureScanner) -> pd.DataFrame:
+        """Match the payloads against YARA rules and extract their IOCs over a process pool, see SignatureScanner.scan"""
+        return scanner.scan(payloads)
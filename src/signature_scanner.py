@@ -0,0 +1,150 @@
+import hashlib
+import io
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+from pathlib import Path
+
+import pandas as pd
+import yara
+from ioc_finder import find_iocs
+
+# IOC types reported by the scanner -> ioc_finder result keys they gather
+IOC_TYPES = {
+    'urls': ['urls'],
+    'ips': ['ipv4s', 'ipv6s'],
+    'domains': ['domains'],
+    'hashes': ['md5s', 'sha1s', 'sha256s', 'sha512s'],
+}
+RULE_SUFFIXES = ('.yar', '.yara')
+
+# Rules of the current worker process, loaded once by init_worker
+_worker_rules = None
+
+
+def init_worker(compiled_rules: bytes | None) -> None:
+    """
+    Load the compiled rules in a worker process, once for all its chunks.
+    """
+    global _worker_rules
+    _worker_rules = None if compiled_rules is None else yara.load(file=io.BytesIO(compiled_rules))
+
+
+def scan_chunk(texts: list, extract_iocs: bool) -> list:
+    """
+    Scan a chunk of payloads with the worker rules and extract their IOCs.
+
+    Module level so it can be sent to a worker process.
+
+    Args:
+        texts (list): Payloads to scan.
+        extract_iocs (bool): Also extract the IOCs of the payloads.
+
+    Returns:
+        list: One tuple per payload, the names of the matching rules joined by
+            ',' (None if no rule matches) then, if extract_iocs, the IOCs of
+            each IOC_TYPES type joined by ',' (None if there is none).
+    """
+    results = []
+    for text in texts:
+        matches = [] if _worker_rules is None else _worker_rules.match(data=text.encode('utf-8', 'replace'))
+        row = (','.join(match.rule for match in matches) or None,)
+        if extract_iocs:
+            iocs = find_iocs(text)
+            row += tuple(','.join(ioc for key in keys for ioc in iocs.get(key, [])) or None
+                         for keys in IOC_TYPES.values())
+        results.append(row)
+    return results
+
+
+class SignatureScanner():
+    """
+    Scan payloads with YARA rules and extract their indicators of compromise.
+
+    The rules of a directory (*.yar and *.yara files, one namespace per file)
+    are compiled once, and each worker process of the pool loads the compiled
+    rules once through its initializer. The distinct payloads are split into
+    chunks of chunk_size payloads, which the workers scan and IOC-extract with
+    ioc_finder. Without a rules directory only the IOCs are extracted.
+
+    Attributes:
+        rules_dir (Path): Directory of the rule files.
+        rule_files (list): Rule files of the directory, sorted.
+        digest (str): Hash of the rule files content, identifies the rule set.
+        max_workers (int | None): Number of worker processes.
+        chunk_size (int): Number of payloads sent to a worker at once.
+        extract_iocs (bool): Also extract the IOCs of the payloads.
+    """
+
+    def __init__(self, rules_dir: str | Path, max_workers: int | None = None, chunk_size: int = 2048,
+                 extract_iocs: bool = True) -> None:
+        """
+        Args:
+            rules_dir (str | Path): Directory of the rule files, it may not exist.
+            max_workers (int | None): Number of worker processes, None for the
+                number of CPUs.
+            chunk_size (int): Number of payloads sent to a worker at once.
+            extract_iocs (bool): Also extract the IOCs of the payloads.
+
+        Returns:
+            None
+
+        Example:
+            scanner = SignatureScanner("rules/")
+            matches = scanner.scan(df["Payload Data"])
+        """
+        self.rules_dir = Path(rules_dir)
+        self.rule_files = sorted(path for path in self.rules_dir.glob('*') if path.suffix in RULE_SUFFIXES)
+        if not self.rule_files:
+            print(f"No YARA rules in {self.rules_dir}, payloads are only scanned for IOCs")
+        digest = hashlib.blake2b(digest_size=8)
+        for path in self.rule_files:
+            digest.update(path.name.encode() + b'\0' + path.read_bytes())
+        self.digest = digest.hexdigest()
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.extract_iocs = extract_iocs
+
+    @cached_property
+    def compiled_rules(self) -> bytes | None:
+        """
+        Rules of the directory compiled once, serialized for the worker processes.
+        """
+        if not self.rule_files:
+            return None
+        rules = yara.compile(filepaths={path.stem: str(path) for path in self.rule_files})
+        buffer = io.BytesIO()
+        rules.save(file=buffer)
+        return buffer.getvalue()
+
+    @property
+    def columns(self) -> list:
+        return ['signatures'] + (list(IOC_TYPES) if self.extract_iocs else [])
+
+    def scan(self, payloads: pd.Series) -> pd.DataFrame:
+        """
+        Scan a payload column.
+
+        Args:
+            payloads (pd.Series): Payloads, missing ones match nothing.
+
+        Returns:
+            pd.DataFrame: Indexed like payloads, with the names of the matching
+                rules in signatures and, if extract_iocs, the urls, ips,
+                domains and hashes found, each joined by ',' and None if empty.
+        """
+        codes, uniques = pd.factorize(payloads)
+        chunks = [list(uniques[i:i + self.chunk_size]) for i in range(0, len(uniques), self.chunk_size)]
+        rows = []
+        if chunks:
+            print(f"Scanning {len(uniques)} distinct payloads in {len(chunks)} chunks with {len(self.rule_files)} rule files")
+            with ProcessPoolExecutor(max_workers=self.max_workers, initializer=init_worker,
+                                     initargs=(self.compiled_rules,)) as executor:
+                for chunk_rows in executor.map(scan_chunk, chunks, [self.extract_iocs] * len(chunks)):
+                    rows.extend(chunk_rows)
+
+        # factorize marks missing payloads with -1, which takes the trailing empty row
+        results = pd.DataFrame(rows + [(None,) * len(self.columns)], columns=self.columns, dtype=object)
+        return results.iloc[codes].set_axis(payloads.index)
+
+    def __repr__(self) -> str:
+        return f"SignatureScanner({self.rules_dir}, rules {self.digest}, iocs {self.extract_iocs})"
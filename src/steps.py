@@ -0,0 +1,310 @@
+import hashlib
+import importlib
+import inspect
+import json
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from graphlib import TopologicalSorter
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Part of every step key, bumped when the layout of the checkpoint files changes
+CHECKPOINT_FORMAT = 2
+
+
+@dataclass(frozen=True)
+class Step():
+    """
+    A step of the analysis and the columns it reads and writes.
+
+    Steps depend on each other through their columns: a step depends on every
+    step producing one of its inputs.
+
+    Attributes:
+        name (str): Short name of the step, also used in its checkpoint file name.
+        description (str): Long name printed at the beginning and end of the step.
+        method (str): Name of the EDA method running the step.
+        methods (tuple): Names of the other EDA methods and properties the step relies on.
+        inputs (tuple): Columns of the working frame the step reads.
+        outputs (tuple): Columns the step adds to (or replaces in) the working frame.
+        artifacts (tuple): Files, relative to the data directory, the step writes.
+        params (tuple): Names of the EDA attributes parametrizing the step.
+        modules (tuple): Modules whose code the step relies on, besides its method.
+    """
+    name: str
+    description: str
+    method: str
+    methods: tuple = ()
+    inputs: tuple = ()
+    outputs: tuple = ()
+    artifacts: tuple = ()
+    params: tuple = ()
+    modules: tuple = ()
+
+
+def run_step(eda, step: Step, frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Run a step on a projection of the working frame.
+
+    Module level so it can be sent to a worker process.
+
+    Args:
+        eda (EDA): EDA instance, pickled without its data frames.
+        step (Step): Step to run.
+        frame (pd.DataFrame): Input columns of the step.
+
+    Returns:
+        pd.DataFrame: The frame after the step, inputs and outputs columns.
+    """
+    eda.cybersecurity_df = frame
+    eda.step_long = step.description
+    eda.print_step_artwork()
+    getattr(eda, step.method)()
+    eda.print_step_artwork(beginning=False)
+    return eda.cybersecurity_df
+
+
+class StepExecutor():
+    """
+    Run the steps of an EDA in dependency order, reusing content-addressed checkpoints.
+
+    Steps are ordered topologically on their columns. Each step is keyed by a
+    hash of its code (its EDA method, the other EDA methods and the modules it
+    relies on), its parameters and the content of its input columns, and its
+    checkpoint file is named after that key. Checkpoints only hold the output columns of
+    their step and a row_id column, and are joined back on row_id into the
+    working frame. A step whose checkpoint exists is skipped and its outputs
+    loaded back, so only the steps invalidated by a code, parameter or input
+    change run again. The other steps run in a process
+    pool as soon as the steps they depend on are done, so independent steps
+    run concurrently. Each worker receives only the input columns of its
+    step, and its outputs are merged back into the working frame.
+
+    Attributes:
+        eda (EDA): EDA instance holding the working frame.
+        steps (dict): Steps by name.
+        force (set): Names of the steps run even if their checkpoint is valid.
+        max_workers (int | None): Number of worker processes.
+    """
+
+    def __init__(self, eda, steps: list, force: bool = False, from_step: str | None = None,
+                 max_workers: int | None = None) -> None:
+        """
+        Args:
+            eda (EDA): EDA instance holding the working frame.
+            steps (list): Steps of the analysis, in any order.
+            force (bool): Run all the steps, ignoring the checkpoints.
+            from_step (str | None): Run this step and all the steps depending on
+                it, ignoring their checkpoints.
+            max_workers (int | None): Number of worker processes, None for the
+                number of CPUs.
+
+        Returns:
+            None
+        """
+        self.eda = eda
+        self.steps = {step.name: step for step in steps}
+        self.max_workers = max_workers
+        if force:
+            self.force = set(self.steps)
+        elif from_step is not None:
+            if from_step not in self.steps:
+                raise ValueError(f"Unknown step {from_step}, expected one of {sorted(self.steps)}")
+            self.force = {from_step} | self.downstream(from_step)
+        else:
+            self.force = set()
+
+    def dependencies(self) -> dict:
+        """
+        Names of the steps each step depends on.
+
+        Returns:
+            dict: Step name -> set of names of the steps producing its inputs.
+        """
+        return {
+            name: {other.name for other in self.steps.values()
+                   if other.name != name and set(step.inputs) & set(other.outputs)}
+            for name, step in self.steps.items()
+        }
+
+    def downstream(self, name: str) -> set:
+        """
+        Names of the steps depending, directly or not, on a step.
+        """
+        dependencies = self.dependencies()
+        found, pending = set(), [name]
+        while pending:
+            current = pending.pop()
+            for other, upstream in dependencies.items():
+                if current in upstream and other not in found:
+                    found.add(other)
+                    pending.append(other)
+        return found
+
+    def step_key(self, step: Step) -> str:
+        """
+        Hash the code version, parameters and inputs of a step.
+
+        Args:
+            step (Step): Step to key, its inputs must be in the working frame.
+
+        Returns:
+            str: Short hexadecimal key of the step.
+        """
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(f"checkpoint format {CHECKPOINT_FORMAT};".encode())
+        for name in (step.method, *step.methods):
+            member = getattr(type(self.eda), name)
+            # Properties and cached properties hash the code of their getter
+            member = getattr(member, 'func', getattr(member, 'fget', member))
+            digest.update(inspect.getsource(member).encode())
+        for module in step.modules:
+            digest.update(inspect.getsource(importlib.import_module(module)).encode())
+        for param in step.params:
+            digest.update(f"{param}={getattr(self.eda, param)!r};".encode())
+        inputs = self.eda.cybersecurity_df[list(step.inputs)]
+        digest.update(repr([(col, str(dtype)) for col, dtype in inputs.dtypes.items()]).encode())
+        digest.update(pd.util.hash_pandas_object(inputs).values.tobytes())
+        return digest.hexdigest()
+
+    def checkpoint_path(self, step: Step, key: str) -> Path:
+        return Path(self.eda.data_dir) / f"{self.eda.dsbasename}{step.name}_{key}{self.eda.ext}"
+
+    def checkpoints(self, step: Step) -> list:
+        """
+        Checkpoint files of a step, most recent first.
+        """
+        paths = Path(self.eda.data_dir).glob(f"{self.eda.dsbasename}{step.name}_*{self.eda.ext}")
+        return sorted(paths, key=lambda path: path.stat().st_mtime, reverse=True)
+
+    def reusable_checkpoint(self, step: Step, key: str) -> Path | None:
+        """
+        Checkpoint a step can be skipped with.
+
+        Args:
+            step (Step): Step to check.
+            key (str): Current key of the step.
+
+        Returns:
+            Path | None: The checkpoint of the current key if it and the step
+                artifacts exist, the latest checkpoint whatever its key if
+                settings ask to skip the step, None if the step has to run.
+        """
+        if step.name in self.force:
+            return None
+        checkpoint = self.checkpoint_path(step, key)
+        if checkpoint.exists() and all((Path(self.eda.data_dir) / a).exists() for a in step.artifacts):
+            return checkpoint
+        if self.eda.steps_to_skip.get(step.name, False) and self.checkpoints(step):
+            print(f"Warning: {step.name} is skipped in the settings, reusing a checkpoint of other code or inputs")
+            return self.checkpoints(step)[0]
+        return None
+
+    def merge(self, result: pd.DataFrame, outputs: tuple, order: list | None = None) -> None:
+        """
+        Merge the outputs of a step into the working frame.
+
+        New columns are inserted after the nearest column preceding them in
+        order that is in the working frame, or before the nearest following
+        one if none precedes them (a worker result only holds the step
+        inputs), existing ones are replaced.
+
+        Args:
+            result (pd.DataFrame): Frame holding the outputs of the step.
+            outputs (tuple): Output columns of the step.
+            order (list | None): Column order after the step, the columns of
+                result if None.
+
+        Returns:
+            None
+        """
+        df = self.eda.cybersecurity_df
+        order = list(result.columns) if order is None else order
+        for col in outputs:
+            if col in df.columns:
+                df[col] = result[col]
+                continue
+            position = order.index(col)
+            previous = next((c for c in reversed(order[:position]) if c in df.columns), None)
+            following = next((c for c in order[position + 1:] if c in df.columns), None)
+            if previous is not None:
+                df.insert(df.columns.get_loc(previous) + 1, col, result[col])
+            elif following is not None:
+                df.insert(df.columns.get_loc(following), col, result[col])
+            else:
+                df.insert(len(df.columns), col, result[col])
+
+    def save(self, step: Step, key: str) -> None:
+        """
+        Write the output columns of a step and remove its checkpoints of other keys.
+
+        The rows are identified by a row_id column holding the index of the
+        working frame, and the column order of the working frame is kept in
+        the parquet metadata so outputs are put back at the same place.
+
+        Args:
+            step (Step): Step that ran.
+            key (str): Key of the step.
+
+        Returns:
+            None
+        """
+        checkpoint = self.checkpoint_path(step, key)
+        print(f"Saving file {checkpoint}")
+        df = self.eda.cybersecurity_df
+        table = pa.Table.from_pandas(df[list(step.outputs)].rename_axis('row_id').reset_index(), preserve_index=False)
+        metadata = {**(table.schema.metadata or dict()), b'column_order': json.dumps(list(df.columns)).encode()}
+        pq.write_table(table.replace_schema_metadata(metadata), checkpoint)
+        for stale in self.checkpoints(step):
+            if stale != checkpoint:
+                stale.unlink()
+
+    def load(self, step: Step, checkpoint: Path) -> None:
+        """
+        Join the output columns saved in a checkpoint into the working frame on row_id.
+        """
+        table = pq.read_table(checkpoint)
+        order = json.loads(table.schema.metadata[b'column_order'])
+        result = table.to_pandas().set_index('row_id').reindex(self.eda.cybersecurity_df.index)
+        self.merge(result, step.outputs, order=order)
+
+    def run(self) -> None:
+        """
+        Run the steps that need to run and load the outputs of the others.
+
+        Returns:
+            None
+
+        Side Effects:
+            - Adds the outputs of every step to eda.cybersecurity_df
+            - Writes the output columns of every step that ran to its checkpoint
+        """
+        sorter = TopologicalSorter(self.dependencies())
+        sorter.prepare()
+        running = dict()
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            while sorter.is_active():
+                for name in sorter.get_ready():
+                    step = self.steps[name]
+                    key = self.step_key(step)
+                    checkpoint = self.reusable_checkpoint(step, key)
+                    if checkpoint is not None:
+                        print(f"Skipping {name}, loading its outputs from {checkpoint}")
+                        self.load(step, checkpoint)
+                        sorter.done(name)
+                        continue
+                    print(f"Running {name}")
+                    frame = self.eda.cybersecurity_df[list(step.inputs)]
+                    running[executor.submit(run_step, self.eda, step, frame)] = (step, key)
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step, key = running.pop(future)
+                    self.merge(future.result(), step.outputs)
+                    self.save(step, key)
+                    sorter.done(step.name)
@@ -0,0 +1,270 @@
+import hashlib
+import json
+import re
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import requests
+
+
+class TranslationBackend(ABC):
+    """
+    Interface of the translation backends used by Translator, subclasses
+    implement translate_batch.
+
+    A backend translates a batch of texts to English. Its name identifies the
+    backend and its configuration, it is part of the translation cache keys
+    so translations of different backends are never mixed up.
+
+    Attributes:
+        name (str): Identifier of the backend and its configuration.
+        batch_size (int): Number of texts sent in a single translate_batch call.
+    """
+
+    name = "base"
+    batch_size = 64
+
+    @abstractmethod
+    def translate_batch(self, texts: list) -> list:
+        """
+        Translate a batch of texts to English.
+
+        Args:
+            texts (list): Texts to translate.
+
+        Returns:
+            list: Translations, in the same order.
+        """
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+class IdentityBackend(TranslationBackend):
+    """
+    Local no-op backend, every text is its own translation.
+    """
+
+    name = "identity"
+    batch_size = 4096
+
+    def translate_batch(self, texts: list) -> list:
+        return list(texts)
+
+
+class DictionaryBackend(TranslationBackend):
+    """
+    Local word by word backend, words missing from the dictionary are kept as is.
+
+    Attributes:
+        mapping (dict): Lower case source word -> English word.
+    """
+
+    batch_size = 4096
+
+    def __init__(self, mapping: dict) -> None:
+        """
+        Args:
+            mapping (dict): Source word -> English word.
+
+        Returns:
+            None
+        """
+        self.mapping = {word.lower(): translation for word, translation in mapping.items()}
+        digest = hashlib.blake2b(json.dumps(self.mapping, sort_keys=True).encode(), digest_size=8).hexdigest()
+        self.name = f"dictionary:{digest}"
+
+    @classmethod
+    def from_tsv(cls, path: str | Path) -> "DictionaryBackend":
+        """
+        Load the dictionary from a tab separated file of (word, translation) lines.
+        """
+        words = pd.read_csv(path, sep='\t', header=None, names=['word', 'translation'], dtype=str)
+        return cls(dict(zip(words['word'], words['translation'])))
+
+    def translate_batch(self, texts: list) -> list:
+        return [re.sub(r'\w+', lambda m: self.mapping.get(m.group(0).lower(), m.group(0)), text) for text in texts]
+
+
+class HTTPBackend(TranslationBackend):
+    """
+    Backend calling a self-hosted translation server with the LibreTranslate API.
+
+    A batch is sent as one POST {url} request with the JSON body
+    {"q": [texts], "source": source, "target": "en", "format": "text"}, and
+    the server answers {"translatedText": [translations]}.
+
+    Attributes:
+        url (str): URL of the translate endpoint.
+        source (str): Source language code, "auto" to let the server detect it.
+        timeout (int): Seconds without answer before a request is abandoned.
+    """
+
+    batch_size = 32
+
+    def __init__(self, url: str, source: str = "auto", timeout: int = 60) -> None:
+        """
+        Args:
+            url (str): URL of the translate endpoint, e.g. http://localhost:5000/translate.
+            source (str): Source language code, "auto" to let the server detect it.
+            timeout (int): Seconds without answer before a request is abandoned.
+
+        Returns:
+            None
+        """
+        self.url = url
+        self.source = source
+        self.timeout = timeout
+        self.name = f"http:{url}:{source}"
+
+    def translate_batch(self, texts: list) -> list:
+        response = requests.post(self.url, json={"q": list(texts), "source": self.source, "target": "en",
+                                                 "format": "text"}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["translatedText"]
+
+
+class MockTranslationServer():
+    """
+    Local stand-in for a LibreTranslate server, for tests and offline runs.
+
+    Serves the HTTPBackend protocol on localhost from a background thread,
+    translating with a local backend.
+
+    Example:
+        with MockTranslationServer(DictionaryBackend({'dolor': 'pain'})) as server:
+            backend = HTTPBackend(server.url)
+    """
+
+    def __init__(self, backend: TranslationBackend | None = None, port: int = 0) -> None:
+        """
+        Args:
+            backend (TranslationBackend | None): Backend answering the requests,
+                IdentityBackend if None.
+            port (int): Port to listen on, 0 for any free port.
+
+        Returns:
+            None
+        """
+        backend = IdentityBackend() if backend is None else backend
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                texts = body["q"] if isinstance(body["q"], list) else [body["q"]]
+                answer = json.dumps({"translatedText": backend.translate_batch(texts)}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(answer)))
+                self.end_headers()
+                self.wfile.write(answer)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/translate"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "MockTranslationServer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class Translator():
+    """
+    Translation stage with a persistent cache, batching and bounded concurrency.
+
+    Each distinct text is translated once: translations are cached by a hash
+    of the backend name and the text, in memory and in a parquet file, and
+    the texts missing from the cache are sent to the backend in batches of
+    backend.batch_size from a bounded thread pool.
+
+    Attributes:
+        backend (TranslationBackend): Backend translating the texts.
+        cache_path (Path | None): Parquet file persisting the cache.
+        max_workers (int): Maximum number of batches translated concurrently.
+        cache (dict): Text key -> translation.
+    """
+
+    def __init__(self, backend: TranslationBackend, cache_path: str | Path | None = None,
+                 max_workers: int = 4) -> None:
+        """
+        Args:
+            backend (TranslationBackend): Backend translating the texts.
+            cache_path (str | Path | None): Parquet file persisting the cache,
+                no persistence if None.
+            max_workers (int): Maximum number of batches translated concurrently.
+
+        Returns:
+            None
+        """
+        self.backend = backend
+        self.cache_path = None if cache_path is None else Path(cache_path)
+        self.max_workers = max_workers
+        self.cache = dict()
+        if self.cache_path is not None and self.cache_path.exists():
+            cached = pd.read_parquet(self.cache_path)
+            self.cache = dict(zip(cached['key'], cached['translation']))
+
+    def text_key(self, text: str) -> str:
+        return hashlib.blake2b(f"{self.backend.name}\0{text}".encode(), digest_size=16).hexdigest()
+
+    def _translate_batch(self, texts: list) -> list:
+        """
+        Translate a batch, None for each text if the backend fails.
+        """
+        try:
+            return self.backend.translate_batch(texts)
+        except Exception as e:
+            print(f"Translation of a batch of {len(texts)} texts with {self.backend} failed. Error: {e}")
+            return [None] * len(texts)
+
+    def translate(self, texts: pd.Series, skip: pd.Series | None = None) -> pd.Series:
+        """
+        Translate a column of texts to English.
+
+        Args:
+            texts (pd.Series): Texts to translate.
+            skip (pd.Series | None): Boolean mask, aligned with texts, of the
+                texts not to translate.
+
+        Returns:
+            pd.Series: Translations indexed like texts, None for the skipped
+                and missing texts and for the texts the backend failed on.
+
+        Side Effects:
+            - Writes the new translations to the cache file
+        """
+        if skip is not None:
+            texts = texts.where(~skip.astype(bool))
+        codes, uniques = pd.factorize(texts)
+        keys = [self.text_key(text) for text in uniques]
+
+        pending = [(key, text) for key, text in zip(keys, uniques) if key not in self.cache]
+        if pending:
+            size = self.backend.batch_size
+            batches = [pending[i:i + size] for i in range(0, len(pending), size)]
+            print(f"Translating {len(pending)} texts in {len(batches)} batches with {self.backend}")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = executor.map(self._translate_batch, [[text for _, text in batch] for batch in batches])
+                new = {key: translation for batch, translations in zip(batches, results)
+                       for (key, _), translation in zip(batch, translations) if translation is not None}
+            self.cache.update(new)
+            if new and self.cache_path is not None:
+                pd.DataFrame({'key': list(self.cache), 'translation': list(self.cache.values())}).to_parquet(self.cache_path)
+
+        # factorize marks skipped and missing texts with -1, which takes the trailing None
+        translations = np.array([self.cache.get(key) for key in keys] + [None], dtype=object)
+        return pd.Series(translations[codes], index=texts.index)
@@ -0,0 +1,115 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+
+class TrigramIndex():
+    """
+    Inverted index of character trigrams for fuzzy name matching.
+
+    Every name is normalized (case folded, accents and punctuation removed),
+    padded with spaces and cut into trigrams. The posting lists of all
+    trigrams are stored as one sorted array of name ids with offsets (CSR
+    layout), so a query only touches the names sharing at least one trigram
+    with it instead of scanning all candidates. Candidates are ranked by the
+    Dice coefficient of their trigram sets.
+
+    Attributes:
+        names (np.ndarray): Indexed names, in the order given to the constructor.
+        threshold (float): Minimum Dice similarity for a match.
+    """
+
+    def __init__(self, names, threshold: float = 0.7) -> None:
+        """
+        Build the index.
+
+        Args:
+            names (iterable): Names to index. When several candidates tie, the
+                first one in this order wins, so pass them by decreasing priority.
+            threshold (float): Minimum Dice similarity, between 0 and 1, for a match.
+
+        Returns:
+            None
+
+        Example:
+            index = TrigramIndex(['Mumbai', 'Pune'], threshold=0.6)
+            index.match(['Mumbay'])
+        """
+        self.names = np.asarray(list(names), dtype=object)
+        self.threshold = threshold
+
+        grams = [self.trigrams(name) for name in self.names]
+        self.sizes = np.fromiter((len(g) for g in grams), dtype=np.int32, count=len(grams))
+
+        self.vocabulary = dict()
+        gram_ids = np.fromiter((self.vocabulary.setdefault(t, len(self.vocabulary)) for g in grams for t in g),
+                               dtype=np.int64, count=int(self.sizes.sum()))
+        name_ids = np.repeat(np.arange(len(grams), dtype=np.int32), self.sizes)
+
+        # CSR layout: the name ids of trigram t are postings[offsets[t]:offsets[t + 1]]
+        order = np.argsort(gram_ids, kind='stable')
+        self.postings = name_ids[order]
+        self.offsets = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(gram_ids, minlength=len(self.vocabulary)), out=self.offsets[1:])
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        """
+        Case fold a name and strip its accents and punctuation.
+        """
+        name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode()
+        return re.sub(r'[^a-z0-9]+', ' ', name.casefold()).strip()
+
+    @classmethod
+    def trigrams(cls, name: str) -> set:
+        """
+        Set of character trigrams of a normalized, space padded name.
+        """
+        padded = f"  {cls.normalize(name)} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def best_match(self, name: str) -> tuple[int, float]:
+        """
+        Find the most similar indexed name.
+
+        Args:
+            name (str): Name to look up.
+
+        Returns:
+            tuple[int, float]: Position of the best match in self.names and its
+                Dice similarity, (-1, 0.0) if no name shares a trigram with it.
+        """
+        grams = self.trigrams(name)
+        query = [self.vocabulary[t] for t in grams if t in self.vocabulary]
+        if not query:
+            return -1, 0.0
+        candidates, overlap = np.unique(
+            np.concatenate([self.postings[self.offsets[t]:self.offsets[t + 1]] for t in query]),
+            return_counts=True)
+        dice = 2 * overlap / (len(grams) + self.sizes[candidates])
+        best = np.argmax(dice)  # candidates are sorted, ties go to the first indexed name
+        return int(candidates[best]), float(dice[best])
+
+    def match(self, names, threshold: float | None = None) -> pd.DataFrame:
+        """
+        Fuzzy match a collection of names against the index.
+
+        Args:
+            names (iterable): Names to look up.
+            threshold (float | None): Minimum Dice similarity, self.threshold if None.
+
+        Returns:
+            pd.DataFrame: One row per name with columns name, match (None when
+                the best similarity is below the threshold) and score.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        names = list(names)
+        records = [self.best_match(name) for name in names]
+        return pd.DataFrame({
+            'name': names,
+            'match': [self.names[position] if position >= 0 and score >= threshold else None
+                      for position, score in records],
+            'score': [score for _, score in records],
+        })
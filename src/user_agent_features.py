@@ -0,0 +1,103 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import pandas as pd
+from user_agents import parse
+
+# Columns derived from the "Device Information" User-Agent strings, in output order
+UA_COLUMNS = [
+    "Browser family",
+    "Browser major",
+    "Browser minor",
+    "OS family",
+    "OS major",
+    "OS minor",
+    "OS patch",
+    "Device family",
+    "Device brand",
+    "Device type",
+    "Device bot",
+]
+
+
+def _nth(values: tuple, n: int):
+    """
+    Return the n-th element of a version tuple, pd.NA if missing or None.
+    """
+    return values[n] if len(values) > n and values[n] is not None else pd.NA
+
+
+@lru_cache(maxsize=None)
+def ua_features(ua_string: str) -> tuple:
+    """
+    Parse a User-Agent string once and derive all its features.
+
+    Results are memoized: the cardinality of User-Agent strings is far below
+    the number of rows, so most calls are cache hits.
+
+    Args:
+        ua_string (str): The User-Agent string.
+
+    Returns:
+        tuple: One value per column of UA_COLUMNS. Missing fields are pd.NA.
+    """
+    if not isinstance(ua_string, str) or not ua_string:
+        return (pd.NA,) * len(UA_COLUMNS)
+
+    ua = parse(ua_string)
+    if ua.is_mobile:
+        device_type = "Mobile"
+    elif ua.is_tablet:
+        device_type = "Tablet"
+    elif ua.is_pc:
+        device_type = "PC"
+    else:
+        device_type = pd.NA
+
+    return (
+        ua.browser.family if ua.browser.family is not None else pd.NA,
+        _nth(ua.browser.version, 0),
+        _nth(ua.browser.version, 1),
+        ua.os.family if ua.os.family is not None else pd.NA,
+        _nth(ua.os.version, 0),
+        _nth(ua.os.version, 1),
+        _nth(ua.os.version, 2),
+        ua.device.family if ua.device.family is not None else pd.NA,
+        ua.device.brand if ua.device.brand is not None else pd.NA,
+        device_type,
+        ua.is_bot,
+    )
+
+
+def extract_ua_features(ua_strings: pd.Series, workers: int | None = None, chunksize: int = 256) -> pd.DataFrame:
+    """
+    Derive the UA_COLUMNS features of a whole column of User-Agent strings.
+
+    Each distinct string is parsed exactly once and the results are broadcast
+    back to the rows. With a cold cache, parsing can be spread over a process
+    pool; the pool must be started from an importable module or a main guarded
+    by `if __name__ == "__main__"` (spawned workers re-import the caller).
+
+    Args:
+        ua_strings (pd.Series): Column of User-Agent strings.
+        workers (int | None): Number of worker processes. None or 1 parses in
+            the current process.
+        chunksize (int): Number of distinct strings sent to a worker at once.
+
+    Returns:
+        pd.DataFrame: DataFrame indexed like ua_strings with the UA_COLUMNS columns.
+
+    Example:
+        df[UA_COLUMNS] = extract_ua_features(df["Device Information"])
+    """
+    codes, uniques = pd.factorize(ua_strings)
+    if workers is not None and workers > 1 and len(uniques) > chunksize:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            records = list(executor.map(ua_features, uniques, chunksize=chunksize))
+    else:
+        records = [ua_features(ua) for ua in uniques]
+    # factorize marks missing values with -1, which takes the trailing empty row
+    records.append((pd.NA,) * len(UA_COLUMNS))
+    features = pd.DataFrame.from_records(records, columns=UA_COLUMNS).take(codes)
+    features.index = ua_strings.index
+    return features